@@ -0,0 +1,109 @@
+"""move logs to crash_logs
+
+Revision ID: 3c49e998c50e
+Revises: 9ef622b49890
+Create Date: 2026-10-18 12:21:07.418092
+
+"""
+import hashlib
+import zlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c49e998c50e'
+down_revision: Union[str, Sequence[str], None] = '9ef622b49890'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rows migrated per round trip
+BATCH_SIZE = 1000
+
+crashedcontainers = sa.table(
+    'crashedcontainers',
+    sa.column('id', sa.Integer),
+    sa.column('logs', sa.String),
+    sa.column('logs_hash', sa.String)
+)
+crash_logs = sa.table(
+    'crash_logs',
+    sa.column('hash', sa.String),
+    sa.column('data', sa.LargeBinary),
+    sa.column('size', sa.Integer)
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crash_logs',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('crashedcontainers', sa.Column('logs_hash', sa.String(length=64), nullable=True))
+
+    conn = op.get_bind()
+    stored: set[str] = set()
+    last_id = 0
+
+    while True:
+        rows = conn.execute(
+            sa.select(crashedcontainers.c.id, crashedcontainers.c.logs)
+            .where(crashedcontainers.c.id > last_id, crashedcontainers.c.logs.is_not(None))
+            .order_by(crashedcontainers.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+
+        if not rows:
+            break
+
+        new_logs = []
+        hashes = []
+        for row_id, logs in rows:
+            data = logs.encode()
+            logs_hash = hashlib.sha256(data).hexdigest()
+            hashes.append({'row_id': row_id, 'logs_hash': logs_hash})
+
+            if logs_hash not in stored:
+                stored.add(logs_hash)
+                new_logs.append({'hash': logs_hash, 'data': zlib.compress(data, 6), 'size': len(data)})
+
+        if new_logs:
+            conn.execute(crash_logs.insert(), new_logs)
+
+        conn.execute(
+            crashedcontainers.update()
+            .where(crashedcontainers.c.id == sa.bindparam('row_id'))
+            .values(logs_hash=sa.bindparam('logs_hash')),
+            hashes
+        )
+        last_id = rows[-1][0]
+
+    with op.batch_alter_table('crashedcontainers') as batch_op:
+        batch_op.drop_column('logs')
+        batch_op.create_foreign_key('fk_crashedcontainers_logs_hash', 'crash_logs', ['logs_hash'], ['hash'])
+        batch_op.create_index('ix_crashedcontainers_logs_hash', ['logs_hash'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.add_column('crashedcontainers', sa.Column('logs', sa.String(length=5000), nullable=True))
+
+    conn = op.get_bind()
+    for logs_hash, data in conn.execute(sa.select(crash_logs.c.hash, crash_logs.c.data)).all():
+        conn.execute(
+            crashedcontainers.update()
+            .where(crashedcontainers.c.logs_hash == logs_hash)
+            .values(logs=zlib.decompress(data).decode())
+        )
+
+    with op.batch_alter_table('crashedcontainers') as batch_op:
+        batch_op.drop_index('ix_crashedcontainers_logs_hash')
+        batch_op.drop_constraint('fk_crashedcontainers_logs_hash', type_='foreignkey')
+        batch_op.drop_column('logs_hash')
+
+    op.drop_table('crash_logs')
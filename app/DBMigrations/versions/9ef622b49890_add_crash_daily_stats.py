@@ -0,0 +1,48 @@
+"""add crash daily stats
+
+Revision ID: 9ef622b49890
+Revises: cdaf3301f4fa
+Create Date: 2026-10-18 11:04:19.552730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ef622b49890'
+down_revision: Union[str, Sequence[str], None] = 'cdaf3301f4fa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('crash_daily_stats',
+    sa.Column('crash_date', sa.Date(), nullable=False),
+    sa.Column('machine', sa.String(length=100), nullable=False),
+    sa.Column('container_name', sa.String(length=100), nullable=False),
+    sa.Column('container_id', sa.String(length=100), nullable=True),
+    sa.Column('crash_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('crash_date', 'machine', 'container_name')
+    )
+
+    op.execute(
+        """
+        INSERT INTO crash_daily_stats 
+            (crash_date, machine, container_name, container_id, crash_count)
+        SELECT 
+            DATE(crashedon), COALESCE(machine, ''), COALESCE(container_name, ''), MAX(container_id), COUNT(*)
+        FROM 
+            crashedcontainers
+        GROUP BY 
+            DATE(crashedon), COALESCE(machine, ''), COALESCE(container_name, '')
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('crash_daily_stats')
@@ -0,0 +1,32 @@
+"""add crashedcontainers indexes
+
+Revision ID: cdaf3301f4fa
+Revises: 54631411a1b3
+Create Date: 2026-10-18 10:12:41.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cdaf3301f4fa'
+down_revision: Union[str, Sequence[str], None] = '54631411a1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_crashedcontainers_crashedon', 'crashedcontainers', ['crashedon'])
+    op.create_index('ix_crashedcontainers_machine_crashedon', 'crashedcontainers', ['machine', 'crashedon'])
+    op.create_index('ix_crashedcontainers_container_name_crashedon', 'crashedcontainers', ['container_name', 'crashedon'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_crashedcontainers_container_name_crashedon', table_name='crashedcontainers')
+    op.drop_index('ix_crashedcontainers_machine_crashedon', table_name='crashedcontainers')
+    op.drop_index('ix_crashedcontainers_crashedon', table_name='crashedcontainers')
@@ -1,34 +1,186 @@
+from __future__ import annotations
 import httpx, json, asyncio, logging
+from contextlib import asynccontextmanager
+from time import perf_counter
+from typing import AsyncIterator, Iterable, TYPE_CHECKING
+from app.backend.utils.log_tailer import LogBuffer
+
+if TYPE_CHECKING:
+    from app.backend.core import AgentConfig, Config
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
 
 
 class AgentClient:
-    def __init__(self, base_url: str, token: str, name:str|None, logger: logging.Logger):
+    def __init__(
+            self,
+            base_url: str,
+            token: str,
+            name:str|None,
+            logger: logging.Logger,
+            verify_ssl: bool = True,
+            http2: bool = True,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 5,
+            keepalive_expiry: float = 30,
+            connect_timeout: float = 5,
+            read_timeout: float = 30,
+            restart_timeout: float = 120,
+            logs_max_bytes: int | None = None,
+            http_client: httpx.AsyncClient | None = None
+        ):
         self.base_url = base_url
         self.name = name
         self.token = token
-        self.verify_ssl: bool = True
+        self.verify_ssl: bool = verify_ssl
         self.headers = {"Authorization": f"Bearer {token}"} if token else {}
         self.logger = logger
-        self.http_client = httpx.AsyncClient(verify=self.verify_ssl)
+
+        self.connect_timeout = connect_timeout
+        self.restart_timeout = restart_timeout
+        # Default byte cap of the container logs read from the agent
+        self.logs_max_bytes = logs_max_bytes
+
+        # A shared client is owned, and closed, by whoever created it
+        self.owns_http_client = http_client is None
+        if http_client is None:
+            http_client = self.build_http_client(
+                logger=logger,
+                verify_ssl=verify_ssl,
+                http2=http2,
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+                connect_timeout=connect_timeout,
+                read_timeout=read_timeout
+            )
+        self.http_client = http_client
+        # httpcore reports the connections it opens through the trace extension of each request
+        self.extensions = {"trace": self._trace}
+
+        self.connections_opened = 0
+        self.http2_responses = 0
+        self.requests_total = 0
+        self.requests_failed = 0
+        self.requests_in_flight = 0
+        self.max_requests_in_flight = 0
+        self.total_latency = 0.0
+
+    @staticmethod
+    def build_http_client(
+            logger: logging.Logger,
+            verify_ssl: bool = True,
+            http2: bool = True,
+            max_connections: int = 10,
+            max_keepalive_connections: int = 5,
+            keepalive_expiry: float = 30,
+            connect_timeout: float = 5,
+            read_timeout: float = 30
+        ) -> httpx.AsyncClient:
+        if http2 and not _http2_available():
+            logger.warning("HTTP/2 requested for the agent client but the 'h2' package is not installed. Falling back to HTTP/1.1")
+            http2 = False
+
+        # HTTP/2 is negotiated through TLS: over plain http the client keeps using HTTP/1.1 with keep-alive
+        return httpx.AsyncClient(
+            verify=verify_ssl,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            ),
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout)
+        )
+
+    @classmethod
+    def from_config(cls, agent: AgentConfig, config: Config, logger: logging.Logger, http_client: httpx.AsyncClient | None = None) -> AgentClient:
+        return cls(
+            base_url=agent.base_url,
+            token=agent.token,
+            name=agent.name,
+            logger=logger,
+            verify_ssl=agent.verify_ssl,
+            http2=config.agent_http2,
+            max_connections=config.agent_max_connections,
+            max_keepalive_connections=config.agent_max_keepalive_connections,
+            keepalive_expiry=config.agent_keepalive_expiry,
+            connect_timeout=config.agent_connect_timeout,
+            read_timeout=config.agent_read_timeout,
+            restart_timeout=config.agent_restart_timeout,
+            logs_max_bytes=config.agent_logs_max_bytes,
+            http_client=http_client
+        )
     
     async def __aenter__(self):
         return self
     
     async def __aexit__(self, exc_type, exc, tb):
-        await self.http_client.aclose()
+        if self.owns_http_client:
+            await self.http_client.aclose()
 
-    async def _request(self, method: str, endpoint: str, **kwargs) -> dict:
-        url = f"{self.base_url}{endpoint}"
+    @asynccontextmanager
+    async def _track(self, method: str, url: str) -> AsyncIterator[None]:
+        """
+        Counts the request in the client stats and logs its failure
+        """
+        started_at = perf_counter()
+        self.requests_total += 1
+        self.requests_in_flight += 1
+        self.max_requests_in_flight = max(self.max_requests_in_flight, self.requests_in_flight)
         try:
-            response = await self.http_client.request(method, url, headers=self.headers, **kwargs)
-            response.raise_for_status()
-            return response.json()
+            yield
         except httpx.HTTPStatusError as e:
+            self.requests_failed += 1
             self.logger.error(f"HTTP error {e.response.status_code} for {method} {url}: {e.response.text}")
             raise
         except Exception as e:
+            self.requests_failed += 1
             self.logger.error(f"Error during {method} {url}: {str(e)}")
             raise
+        finally:
+            self.requests_in_flight -= 1
+            self.total_latency += perf_counter() - started_at
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> dict:
+        url = f"{self.base_url}{endpoint}"
+        async with self._track(method, url):
+            response = await self.http_client.request(method, url, headers=self.headers, extensions=self.extensions, **kwargs)
+            self._record_response(response)
+            response.raise_for_status()
+            return response.json()
+
+    async def _trace(self, event: str, info: dict):
+        if event == "connection.connect_tcp.complete":
+            self.connections_opened += 1
+
+    def _record_response(self, response: httpx.Response):
+        if response.http_version == "HTTP/2":
+            self.http2_responses += 1
+
+    def pool_stats(self) -> dict:
+        """
+        Connection usage of this agent client, from the public httpx response data and httpcore trace events.
+        A low connection reuse means the pool keeps opening new connections, e.g. because it is too small
+        """
+        return {
+            "agent": self.name,
+            "base_url": self.base_url,
+            "connections_opened": self.connections_opened,
+            "connection_reuse": max(1 - self.connections_opened / self.requests_total, 0.0) if self.requests_total else 0.0,
+            "http2_responses": self.http2_responses,
+            "requests_total": self.requests_total,
+            "requests_failed": self.requests_failed,
+            "requests_in_flight": self.requests_in_flight,
+            "max_requests_in_flight": self.max_requests_in_flight,
+            "avg_latency": self.total_latency / self.requests_total if self.requests_total else 0.0
+        }
 
     async def health_check(self):
         return await self._request("GET", "/health")
@@ -37,23 +189,90 @@ class AgentClient:
         return await self._request("GET", "/containers")
 
     async def restart_container(self, id: str | None = None):
-        return await self._request("POST", f"/containers/restart", params={"id": id} if id else {})
+        # A restart lasts as long as the container takes to stop, which is usually longer than the default read timeout
+        timeout = httpx.Timeout(self.restart_timeout, connect=self.connect_timeout)
+        return await self._request("POST", f"/containers/restart", params={"id": id} if id else {}, timeout=timeout)
 
     async def get_container(self, id: str | None = None):
         return await self._request("GET", "/containers/search", params={"id": id} if id else {})
 
-    async def get_container_logs(self, id: str | None = None, tail: int = 10):
-        return await self._request("GET", "/containers/logs", params={"id": id, "tail": tail} if id else {})
+    async def get_container_logs(self, id: str | None = None, tail: int = 10, max_bytes: int | None = None, timestamps: bool = False) -> str:
+        """
+        Reads the container logs, capped to their most recent max_bytes by the agent. They are capped again while they arrive,
+        for agents that stream them uncapped or, without the streaming mode, answer with the whole logs as JSON
+        """
+        max_bytes = max_bytes or self.logs_max_bytes
+        buffer = LogBuffer(tail, max_bytes) if max_bytes else None
+        chunks: list[bytes] = []
+
+        async for chunk in self.stream_container_logs(id, tail, max_bytes, timestamps):
+            if buffer is not None:
+                buffer.feed(chunk)
+            else:
+                chunks.append(chunk)
+
+        logs = buffer.tail(tail) if buffer is not None else b''.join(chunks)
+        return logs.decode('utf-8', errors='ignore')
+
+    async def stream_container_logs(self, id: str | None = None, tail: int = 10, max_bytes: int | None = None, timestamps: bool = False) -> AsyncIterator[bytes]:
+        """
+        Yields the container logs as they arrive from the agent, so they can be forwarded before the whole tail is read.
+        With max_bytes, the agent reads the whole tail first and only sends its most recent max_bytes.
+        Agents without the streaming mode answer with the whole logs as JSON, yielded at once
+        """
+        url = f"{self.base_url}/containers/logs"
+        params = {"id": id, "tail": tail, "timestamps": timestamps, "stream": True} if id else {}
+        if id and max_bytes:
+            params["max_bytes"] = max_bytes
+
+        async with self._track("GET", url):
+            async with self.http_client.stream("GET", url, headers=self.headers, params=params, extensions=self.extensions) as response:
+                self._record_response(response)
+                if response.is_error:
+                    await response.aread()
+                response.raise_for_status()
+
+                if response.headers.get("content-type", "").startswith("application/json"):
+                    logs: str = json.loads(await response.aread())
+                    yield logs.encode('utf-8')
+                    return
+
+                async for chunk in response.aiter_bytes():
+                    yield chunk
+
+    async def run_restart_plan(self, plan: dict):
+        url = f"{self.base_url}/containers/restart-plan"
+
+        async with self.http_client.stream("POST", url, headers=self.headers, json=plan, timeout=httpx.Timeout(None, connect=self.connect_timeout), extensions=self.extensions) as response:
+            self._record_response(response)
+            try:
+                response.raise_for_status()
+            except httpx.HTTPStatusError as e:
+                await response.aread()
+                self.logger.error(f"HTTP error {e.response.status_code} for POST {url}: {e.response.text}")
+                raise
+
+            async for line in response.aiter_lines():
+                if line:
+                    yield json.loads(line)
     
-    async def stream_events(self):
+    async def stream_events(self, actions: Iterable[str] | None = None):
         url = f"{self.base_url}/events/stream"
+        # Agents that don't know these parameters ignore them and keep sending full events, which are parsed the same way
+        params = {"format": "compact"}
+        if actions:
+            params["actions"] = list(actions)
         delay = 2
         max_delay = 60
         
         while True:
             try:
                 try:
-                    async with self.http_client.stream("GET", url, headers=self.headers, timeout=None) as response:
+                    async with self.http_client.stream("GET", url, headers=self.headers, params=params, timeout=httpx.Timeout(None, connect=self.connect_timeout), extensions=self.extensions) as response:
+                        self._record_response(response)
+                        # The error body is read while the stream is still open, so the error log below can show it
+                        if response.is_error:
+                            await response.aread()
                         response.raise_for_status()
                         self.logger.info(f"[Agent {self.base_url}] Connected to event stream")
                         delay = 2  # Reset delay on successful connection
@@ -1,10 +1,14 @@
 from __future__ import annotations
+import json
 from typing import TYPE_CHECKING
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import docker
 import uvicorn
 from app.agent.services import AgentService
+from app.agent.utils.compression import MIN_COMPRESS_SIZE, compress, compress_stream, negotiate_encoding
+from app.backend.schemas.restart_plan_schema import RestartPlan
+from app.backend.utils.log_tailer import LogTailer
 from logging import Logger
 from docker.errors import NotFound, APIError
 
@@ -17,7 +21,8 @@ class AgentServer:
         self.logger = logger
         self.app = FastAPI()
         self.docker_client = docker.from_env()
-        self.service = AgentService(self.docker_client, self.logger)
+        self.log_tailer = LogTailer.from_config(config, logger) if config.enable_log_tail else None
+        self.service = AgentService(self.docker_client, self.logger, self.log_tailer)
         self._setup_routes()
 
 
@@ -51,10 +56,34 @@ class AgentServer:
             return self.service.get_container(id)
 
         @app.get('/containers/logs', dependencies=[Depends(verify_token)])
-        def get_container_logs(id: str | None = None, tail: int = 10):
+        def get_container_logs(request: Request, id: str | None = None, tail: int = 10, max_bytes: int | None = None, timestamps: bool = False, stream: bool = False):
             if not id:
                 raise HTTPException(status_code=400, detail="Either name or id must be provided")
-            return self.service.get_logs(id, tail)
+
+            # Compressed with gzip, or brotli when installed, as accepted by the client
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+
+            # Plain text, forwarded as it is read from the daemon. With max_bytes, the logs are capped here before anything is
+            # sent: the payload never exceeds the cap, at the cost of waiting for the daemon to send the whole tail first
+            if stream:
+                from fastapi.responses import StreamingResponse
+                try:
+                    chunks = self.service.iter_logs(id, tail, timestamps, max_bytes)
+                except NotFound:
+                    raise HTTPException(status_code=404, detail="Container not found")
+
+                return StreamingResponse(
+                    compress_stream(chunks, encoding) if encoding else chunks,
+                    media_type="text/plain; charset=utf-8",
+                    headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"} if encoding else {"Vary": "Accept-Encoding"}
+                )
+
+            body = json.dumps(self.service.get_logs(id, tail, max_bytes, timestamps)).encode()
+
+            if encoding is None or len(body) < MIN_COMPRESS_SIZE:
+                return Response(body, media_type="application/json", headers={"Vary": "Accept-Encoding"})
+
+            return Response(compress(body, encoding), media_type="application/json", headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"})
 
         @app.post("/containers/restart", dependencies=[Depends(verify_token)])
         def restart_container(id: str | None = None):
@@ -66,13 +95,21 @@ class AgentServer:
                 raise HTTPException(status_code=404, detail="Container not found")
             except APIError as e:
                 raise HTTPException(status_code=500, detail=str(e))
+
+        @app.post("/containers/restart-plan", dependencies=[Depends(verify_token)])
+        def run_restart_plan(plan: RestartPlan):
+            from fastapi.responses import StreamingResponse
+            return StreamingResponse(
+                self.service.run_restart_plan(plan),
+                media_type="application/x-ndjson"
+            )
             
 
         @app.get("/events/stream", dependencies=[Depends(verify_token)])
-        async def event_stream():
+        async def event_stream(actions: list[str] | None = Query(default=None), format: str = "full"):
             from fastapi.responses import StreamingResponse
             return StreamingResponse(
-                self.service.stream_events(), 
+                self.service.stream_events(actions, compact=format == "compact"), 
                 media_type="text/event-stream"
             )
 
@@ -81,8 +118,15 @@ class AgentServer:
             self.logger.warning("Unable to start Agent server. Agent Host and Agent Port not specified")
             return
 
-        uvicorn.run(
-            self.app,
-            host= self.config.agent_host,
-            port= self.config.agent_port
-        )
\ No newline at end of file
+        if self.log_tailer is not None:
+            self.log_tailer.start()
+
+        try:
+            uvicorn.run(
+                self.app,
+                host= self.config.agent_host,
+                port= self.config.agent_port
+            )
+        finally:
+            if self.log_tailer is not None:
+                self.log_tailer.stop()
\ No newline at end of file
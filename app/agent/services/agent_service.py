@@ -1,24 +1,56 @@
 import asyncio
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from logging import Logger
-from typing import AsyncIterator
+from typing import AsyncIterator, Iterator
 from docker import DockerClient
 from docker.models.containers import Container
+from app.backend.models import DependencyGraph
+from app.backend.schemas.restart_plan_schema import RestartPlan, RestartProgress
+from app.backend.utils.log_tailer import LogBuffer, LogTailer
 
 
 class AgentService:
-    def __init__(self, client: DockerClient, logger: Logger):
+    # Actor attributes kept in the compact event format. Anything else is dropped before sending.
+    # The dependency label and oldName let the server keep its dependency graph up to date from create/rename events,
+    # exitCode lets it track container state from die events
+    COMPACT_EVENT_ATTRIBUTES = ("name", "oldName", "exitCode", DependencyGraph.DEPENDS_ON_LABEL)
+    # Seconds between two readiness checks while running a restart plan
+    READY_POLL_INTERVAL = 1
+
+    def __init__(self, client: DockerClient, logger: Logger, log_tailer: LogTailer | None = None):
         self.client = client
         self.logger = logger
+        self.log_tailer = log_tailer
+
+    def stream_events(self, actions: list[str] | None = None, compact: bool = False):
+        filters: dict = {"type": "container"}
+
+        # The filtering happens on the docker daemon, so unwanted events never reach the agent
+        if actions:
+            filters["event"] = actions
 
-    def stream_events(self):
-        for event in self.client.events(decode=True):
+        for event in self.client.events(decode=True, filters=filters):
             try:
                 if event.get("Type") == "container":
-                    yield f"data: {json.dumps(event)}\n\n"
+                    payload = self._compact_event(event) if compact else event
+                    yield f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
             except Exception as e:
                 self.logger.error(f"Event stream error: {e}")
 
+    def _compact_event(self, event: dict) -> dict:
+        actor = event.get("Actor", {})
+        attributes = actor.get("Attributes", {})
+
+        return {
+            "Action": event.get("Action", ""),
+            "id": event.get("id") or actor.get("ID", ""),
+            "Actor": {
+                "Attributes": {key: attributes[key] for key in self.COMPACT_EVENT_ATTRIBUTES if key in attributes}
+            }
+        }
+
     def restart_container(self, id: str | None = None):
         try:
             if not id:
@@ -29,6 +61,69 @@ class AgentService:
         except Exception as e:
             raise RuntimeError(f"Error restarting container: {e}")
 
+    def run_restart_plan(self, plan: RestartPlan):
+        """
+        Runs a restart plan tier by tier, restarting the containers of a tier in parallel.
+        Yields one NDJSON line per progress update
+        """
+        failed: set[str] = set()
+        wait_ready = set(plan.wait_ready)
+
+        with ThreadPoolExecutor(max_workers=max(1, plan.max_parallel), thread_name_prefix="restart-plan") as pool:
+            for tier in plan.tiers:
+                futures = {}
+
+                for name in tier:
+                    blocked = [parent for parent in plan.parents.get(name, []) if parent in failed]
+
+                    if blocked:
+                        failed.add(name)
+                        yield self._progress(name, "skipped", f"Parent(s) not ready: {blocked}")
+                        continue
+
+                    yield self._progress(name, "restarting")
+                    futures[pool.submit(self._restart_and_wait, name, name in wait_ready, plan.ready_timeout)] = name
+
+                for future in as_completed(futures):
+                    name = futures[future]
+                    status, detail = future.result()
+
+                    if status not in ("restarted", "ready"):
+                        failed.add(name)
+
+                    yield self._progress(name, status, detail)
+
+    def _restart_and_wait(self, name: str, wait_ready: bool, timeout: int) -> tuple[str, str | None]:
+        try:
+            container = self.client.containers.get(name)
+            container.restart()
+        except Exception as e:
+            self.logger.error(f"Error restarting container {name}: {e}")
+            return "failed", str(e)
+
+        if not wait_ready:
+            return "restarted", None
+
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            try:
+                container.reload()
+                state = container.attrs.get("State", {})
+                health_status = state.get("Health", {}).get("Status", "unknown")
+
+                # A container health status is unknown when there's no healthcheck for it
+                if state.get("Status") == "running" and health_status in ("healthy", "unknown"):
+                    return "ready", None
+            except Exception as e:
+                self.logger.warning(f"Unable to check whether {name} is ready: {e}")
+
+            time.sleep(self.READY_POLL_INTERVAL)
+
+        return "not_ready", f"Did not recover within {timeout}s"
+
+    def _progress(self, name: str, status: str, detail: str | None = None) -> str:
+        return RestartProgress(container=name, status=status, detail=detail).model_dump_json() + "\n"
+
     def list_containers(self) -> list[dict]:
         try:
             containers = self.client.containers.list(all=True)
@@ -47,16 +142,43 @@ class AgentService:
         except Exception as e:
             raise RuntimeError(f"Error getting container: {e}")
 
-    def get_logs(self, id: str | None = None, tail: int = 10) -> str:
+    def get_logs(self, id: str | None = None, tail: int = 10, max_bytes: int | None = None, timestamps: bool = False) -> str:
+        """
+        Last tail lines of the container logs. With max_bytes, only the most recent max_bytes are kept, and never held in memory beyond that
+        """
         try:
-            if not id:
-                raise ValueError("Either name or id must be provided")
-            
-            container = self.client.containers.get(id)
-            logs = container.logs(tail=tail).decode('utf-8', errors='ignore')
-            return logs
+            return b''.join(self.iter_logs(id, tail, timestamps, max_bytes)).decode('utf-8', errors='ignore')
         except Exception as e:
             raise RuntimeError(f"Error getting container logs: {e}")
+
+    def iter_logs(self, id: str | None = None, tail: int = 10, timestamps: bool = False, max_bytes: int | None = None) -> Iterator[bytes]:
+        """
+        Streams the last tail lines of the container logs as they are read from the daemon.
+        With max_bytes, the logs are read to the end first, so only their most recent max_bytes are sent.
+        The container is looked up right away, so a missing one fails before anything is streamed
+        """
+        if not id:
+            raise ValueError("Either name or id must be provided")
+
+        chunks = None
+
+        # The tail buffer holds the lines without their timestamps
+        if self.log_tailer is not None and not timestamps:
+            logs = self.log_tailer.snapshot(id, tail)
+            if logs is not None:
+                chunks = iter([logs.encode('utf-8')])
+
+        if chunks is None:
+            container = self.client.containers.get(id)
+            chunks = container.logs(stream=True, follow=False, tail=tail, timestamps=timestamps)
+
+        if not max_bytes:
+            return chunks
+
+        buffer = LogBuffer(tail, max_bytes)
+        for chunk in chunks:
+            buffer.feed(chunk)
+        return iter([buffer.tail(tail)])
         
     def _serialize_container(self, container: Container) -> dict:
         attrs = container.attrs
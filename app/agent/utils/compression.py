@@ -0,0 +1,74 @@
+import zlib
+from time import monotonic
+from typing import Iterable, Iterator
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Responses smaller than this are sent as is: compressing them costs more than it saves
+MIN_COMPRESS_SIZE = 1024
+# A compressed stream is flushed once this many bytes were read, or when a chunk is read STREAM_FLUSH_INTERVAL seconds or more after
+# the oldest unflushed one. Every flush ends a compression block, so flushing on every small chunk would cost most of the compression
+STREAM_FLUSH_SIZE = 4096
+STREAM_FLUSH_INTERVAL = 0.1
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """
+    Picks the content encoding to answer with from the Accept-Encoding header: br when brotli is installed, then gzip
+    """
+    accepted = set()
+
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data)
+    return zlib.compress(data, wbits=zlib.MAX_WBITS | 16)
+
+
+def compress_stream(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """
+    Compresses the chunks as they are read. Small chunks are flushed together, after STREAM_FLUSH_SIZE bytes or
+    STREAM_FLUSH_INTERVAL seconds, so the receiver gets the logs shortly after they are read without each chunk paying for a flush
+    """
+    if encoding == "br":
+        compressor = brotli.Compressor()
+        process, sync, finish = compressor.process, compressor.flush, compressor.finish
+    else:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+        process, sync, finish = compressor.compress, lambda: compressor.flush(zlib.Z_SYNC_FLUSH), compressor.flush
+
+    pending = 0
+    pending_since = 0.0
+    for chunk in chunks:
+        data = process(chunk)
+        if not pending:
+            pending_since = monotonic()
+        pending += len(chunk)
+
+        if pending >= STREAM_FLUSH_SIZE or monotonic() - pending_since >= STREAM_FLUSH_INTERVAL:
+            data += sync()
+            pending = 0
+
+        if data:
+            yield data
+
+    yield finish()
@@ -1,6 +1,8 @@
 from fastapi import APIRouter
-from app.backend.api.routers import auth, crashed_containers
+from app.backend.api.routers import agents, auth, crash_loops, crashed_containers
 
 api_router = APIRouter()
 api_router.include_router(crashed_containers.router)
+api_router.include_router(crash_loops.router)
+api_router.include_router(agents.router)
 api_router.include_router(auth.router)
\ No newline at end of file
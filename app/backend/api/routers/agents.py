@@ -0,0 +1,9 @@
+from fastapi import APIRouter, Depends
+from app.backend.core import state
+from app.backend.core.security import require_admin
+
+router = APIRouter(prefix="/agents", tags=["Agents"], dependencies=[Depends(require_admin)])
+
+@router.get("/pool-stats")
+def get_agents_pool_stats():
+    return [agent_client.pool_stats() for agent_client in state.agent_clients]
\ No newline at end of file
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends, HTTPException
+from app.backend.core import state
+from app.backend.core.security import require_admin
+from app.backend.schemas.crash_loop_schema import CrashLoopState
+
+router = APIRouter(prefix="/crash-loops", tags=["Crash Loops"], dependencies=[Depends(require_admin)])
+
+@router.get("", response_model=list[CrashLoopState])
+def list_crash_loops():
+    return [crash_loop for runtime in state.runtimes.values() for crash_loop in runtime.crash_loop_tracker.states()]
+
+@router.post("/{machine}/{container_name}/reset")
+def reset_crash_loop(machine: str, container_name: str, restart: bool = True):
+    """
+    Closes the circuit breaker of a container and cancels its scheduled trial restart. With restart, the container is
+    restarted right away if the restart policy still applies to it
+    """
+    runtime = state.runtimes.get(machine)
+    known, restart_scheduled = runtime.reset_crash_loop(container_name, restart) if runtime is not None else (False, False)
+
+    if not known:
+        raise HTTPException(status_code=404, detail=f"No crash loop tracked for {container_name} on {machine}")
+
+    return {"machine": machine, "container_name": container_name, "state": "closed", "restart": "scheduled" if restart_scheduled else "none"}
@@ -1,14 +1,56 @@
-from fastapi import APIRouter, Depends
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from app.backend.core.security import require_admin
-from app.backend.schemas.crashed_container_schema import CrashedContainerLogs
+from app.backend.schemas.crashed_container_schema import CrashedContainerItem, CrashedContainerPage
 from app.backend.schemas.chart_stats_schema import ChartStats
-from app.backend.services import StatsService
+from app.backend.services import ExportService, StatsService
 
 router = APIRouter(prefix="/crashed_containers", tags=["Crashed Containers"], dependencies=[Depends(require_admin)])
 
-@router.get("", response_model=list[CrashedContainerLogs])
-def list_crashed_containers(date_from:str, date_to:str):
-    return StatsService.get_crashed_containers(date_from, date_to)
+@router.get("", response_model=CrashedContainerPage)
+def list_crashed_containers(
+    date_from:str,
+    date_to:str,
+    limit:int = Query(default=100, ge=1, le=StatsService.MAX_PAGE_SIZE),
+    cursor:str | None = None,
+    include_logs:bool = True,
+    order:Literal["asc", "desc"] = "asc"
+):
+    try:
+        return StatsService.get_crashed_containers(date_from, date_to, limit, cursor, include_logs, order)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export")
+def export_crashed_containers(
+    date_from:str,
+    date_to:str,
+    format:Literal["ndjson", "csv"] = "ndjson",
+    include_logs:bool = True,
+    gzip:bool = False
+):
+    try:
+        content = ExportService.export_crashed_containers(date_from, date_to, format, include_logs, gzip)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"crashes_{date_from}_{date_to}.{format}" + (".gz" if gzip else "")
+
+    return StreamingResponse(
+        content,
+        media_type="application/gzip" if gzip else ExportService.MEDIA_TYPE[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/{crash_id}/logs", response_model=CrashedContainerItem)
+def get_crashed_container_logs(crash_id:int):
+    crashed_container = StatsService.get_crashed_container_logs(crash_id)
+
+    if crashed_container is None:
+        raise HTTPException(status_code=404, detail="Crash not found")
+
+    return crashed_container
 
 @router.get("/chart-stats", response_model=list[ChartStats])
 def get_crashed_containers_graph_stats(date_from:str, date_to:str):
@@ -28,12 +28,49 @@ class Config:
     agent_host: str | None = field(default = None) 
     agent_port: int | None = field(default = None)
     agent_token: str | None = field(default = None, repr=False)
+    docker_executor_workers: int = field(default = 8)
+    docker_call_timeout: int = field(default = 30)
+    docker_restart_timeout: int = field(default = 120)
+    docker_restart_concurrency: int = field(default = 4)
+    restart_concurrency: int = field(default = 4)
+    container_cache_ttl: int = field(default = 60)
+    agent_http2: bool = field(default = True)
+    agent_max_connections: int = field(default = 10)
+    agent_max_keepalive_connections: int = field(default = 5)
+    agent_keepalive_expiry: int = field(default = 30)
+    agent_connect_timeout: int = field(default = 5)
+    agent_read_timeout: int = field(default = 30)
+    agent_restart_timeout: int = field(default = 120)
+    agent_runtime_shards: int = field(default = 1)
+    crash_batch_size: int = field(default = 50)
+    crash_flush_interval: float = field(default = 2)
+    crash_queue_size: int = field(default = 1000)
+    retention_policy: dict = field(default_factory=dict)
+    retention_interval: int = field(default = 86400)
+    retention_batch_size: int = field(default = 1000)
+    crash_loop_max_crashes: int = field(default = 5)
+    crash_loop_window: int = field(default = 600)
+    crash_loop_reset: int = field(default = 1800)
+    restart_backoff_base: int = field(default = 10)
+    restart_backoff_max: int = field(default = 300)
+    notification_timeout: int = field(default = 10)
+    notification_retries: int = field(default = 3)
+    notification_queue_size: int = field(default = 100)
+    notification_digest_window: int = field(default = 0)
+    notification_digest_max_size: int = field(default = 20)
+    dashboard_url: str | None = field(default = None)
+    notification_template_engine: str = field(default = "format")
+    enable_log_tail: bool = field(default = False)
+    log_tail_max_lines: int = field(default = 1000)
+    log_tail_max_bytes: int = field(default = 262144)
+    agent_logs_max_bytes: int = field(default = 1048576)
     
     @classmethod
     def load(cls):
         try:
             load_dotenv()
             restart_policy = getenv("RESTART_POLICY", "")
+            retention_policy = getenv("RETENTION_POLICY", "")
             notification_urls = getenv("NOTIFICATION_URLS", "")
             
             try:
@@ -57,7 +94,43 @@ class Config:
                 agents_config = [AgentConfig.from_dict(agent) for agent in json.loads(getenv("AGENTS_CONFIG", "[]"))],
                 agent_host = getenv("AGENT_HOST", "127.0.0.1"),
                 agent_port = int(getenv("AGENT_PORT", "8000")),
-                agent_token = getenv("AGENT_TOKEN", None)
+                agent_token = getenv("AGENT_TOKEN", None),
+                docker_executor_workers = int(getenv("DOCKER_EXECUTOR_WORKERS", "8")),
+                docker_call_timeout = int(getenv("DOCKER_CALL_TIMEOUT", "30")),
+                docker_restart_timeout = int(getenv("DOCKER_RESTART_TIMEOUT", "120")),
+                docker_restart_concurrency = int(getenv("DOCKER_RESTART_CONCURRENCY", "4")),
+                restart_concurrency = int(getenv("RESTART_CONCURRENCY", "4")),
+                container_cache_ttl = int(getenv("CONTAINER_CACHE_TTL", "60")),
+                agent_http2 = getenv("AGENT_HTTP2", "true").strip().lower() == "true",
+                agent_max_connections = int(getenv("AGENT_MAX_CONNECTIONS", "10")),
+                agent_max_keepalive_connections = int(getenv("AGENT_MAX_KEEPALIVE_CONNECTIONS", "5")),
+                agent_keepalive_expiry = int(getenv("AGENT_KEEPALIVE_EXPIRY", "30")),
+                agent_connect_timeout = int(getenv("AGENT_CONNECT_TIMEOUT", "5")),
+                agent_read_timeout = int(getenv("AGENT_READ_TIMEOUT", "30")),
+                agent_restart_timeout = int(getenv("AGENT_RESTART_TIMEOUT", "120")),
+                agent_runtime_shards = int(getenv("AGENT_RUNTIME_SHARDS", "1")),
+                crash_batch_size = int(getenv("CRASH_BATCH_SIZE", "50")),
+                crash_flush_interval = float(getenv("CRASH_FLUSH_INTERVAL", "2")),
+                crash_queue_size = int(getenv("CRASH_QUEUE_SIZE", "1000")),
+                retention_policy = json.loads(retention_policy) if len(retention_policy) > 0 else {},
+                retention_interval = int(getenv("RETENTION_INTERVAL", "86400")),
+                retention_batch_size = int(getenv("RETENTION_BATCH_SIZE", "1000")),
+                crash_loop_max_crashes = int(getenv("CRASH_LOOP_MAX_CRASHES", "5")),
+                crash_loop_window = int(getenv("CRASH_LOOP_WINDOW", "600")),
+                crash_loop_reset = int(getenv("CRASH_LOOP_RESET", "1800")),
+                restart_backoff_base = int(getenv("RESTART_BACKOFF_BASE", "10")),
+                restart_backoff_max = int(getenv("RESTART_BACKOFF_MAX", "300")),
+                notification_timeout = int(getenv("NOTIFICATION_TIMEOUT", "10")),
+                notification_retries = int(getenv("NOTIFICATION_RETRIES", "3")),
+                notification_queue_size = int(getenv("NOTIFICATION_QUEUE_SIZE", "100")),
+                notification_digest_window = int(getenv("NOTIFICATION_DIGEST_WINDOW", "0")),
+                notification_digest_max_size = int(getenv("NOTIFICATION_DIGEST_MAX_SIZE", "20")),
+                dashboard_url = getenv("DASHBOARD_URL", None),
+                notification_template_engine = getenv("NOTIFICATION_TEMPLATE_ENGINE", "format").strip().lower(),
+                enable_log_tail = getenv("ENABLE_LOG_TAIL", "false").strip().lower() == "true",
+                log_tail_max_lines = int(getenv("LOG_TAIL_MAX_LINES", "1000")),
+                log_tail_max_bytes = int(getenv("LOG_TAIL_MAX_BYTES", "262144")),
+                agent_logs_max_bytes = int(getenv("AGENT_LOGS_MAX_BYTES", "1048576"))
             )
         except Exception as e:
             raise Exception(f"Unable to load the config: {e}")
@@ -1,5 +1,6 @@
 from logging import Logger
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from alembic import command
@@ -7,18 +8,153 @@ from alembic.config import Config
 import os
 
 DB_URI = os.getenv('DATABASE_URI', 'sqlite:///./app/data/database.db')
+# Optional replica for the dashboard queries. Defaults to the main database
+DB_READ_URI = os.getenv('DATABASE_READ_URI', DB_URI)
 INITIAL_MIGRATION_ID = '2a3ad493a301'
 
-engine = create_engine(DB_URI, echo=False)
+# SQLite storage profile
+DB_JOURNAL_MODE = os.getenv('DB_JOURNAL_MODE', 'WAL')
+DB_SYNCHRONOUS = os.getenv('DB_SYNCHRONOUS', 'NORMAL')
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(256 * 1024 * 1024)))
+# Negative values are in KiB, positive ones in pages
+DB_CACHE_SIZE = int(os.getenv('DB_CACHE_SIZE', '-20000'))
+DB_BUSY_TIMEOUT = int(os.getenv('DB_BUSY_TIMEOUT', '5000'))
+# INCREMENTAL lets the retention job give the space of deleted rows back to the file system. When unset, new databases are
+# created INCREMENTAL and existing ones keep their mode: converting them rewrites the whole file with a VACUUM
+DB_AUTO_VACUUM = os.getenv('DB_AUTO_VACUUM', '').strip().upper()
+
+# Connection pools
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '10'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', '1800'))
+
+
+AUTO_VACUUM_MODES = {'NONE': 0, 'FULL': 1, 'INCREMENTAL': 2}
+
+
+def is_sqlite(uri: str) -> bool:
+    return make_url(uri).get_backend_name() == 'sqlite'
+
+def is_sqlite_memory(uri: str) -> bool:
+    return is_sqlite(uri) and make_url(uri).database in (None, '', ':memory:')
+
+def build_engine(uri: str, read_only: bool = False) -> Engine:
+    """
+    Creates an engine with the pool settings. SQLite connections also get the storage profile pragmas,
+    and the write engine holds a single connection since SQLite only ever has one writer at a time
+    """
+    if not is_sqlite(uri):
+        return create_engine(
+            uri,
+            echo=False,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+
+    if is_sqlite_memory(uri):
+        return create_engine(uri, echo=False)
+
+    sqlite_engine = create_engine(
+        uri,
+        echo=False,
+        connect_args={'check_same_thread': False},
+        pool_size=DB_POOL_SIZE if read_only else 1,
+        max_overflow=DB_MAX_OVERFLOW if read_only else 0,
+        pool_timeout=DB_POOL_TIMEOUT
+    )
+
+    @event.listens_for(sqlite_engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA synchronous={DB_SYNCHRONOUS}')
+        cursor.execute(f'PRAGMA mmap_size={DB_MMAP_SIZE}')
+        cursor.execute(f'PRAGMA cache_size={DB_CACHE_SIZE}')
+        cursor.execute(f'PRAGMA busy_timeout={DB_BUSY_TIMEOUT}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+
+    return sqlite_engine
+
+
+engine = build_engine(DB_URI)
+# An in-memory database only exists on its own connection, so it can't be split in two pools
+read_engine = engine if is_sqlite_memory(DB_READ_URI) else build_engine(DB_READ_URI, read_only=True)
 Base = declarative_base()
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+# Sessions for queries that never write, backed by their own pool
+ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False)
 
 
 def init_db(logger:Logger):
     from app.backend.models.crashed_container import CrashedContainer
+    from app.backend.models.crash_daily_stat import CrashDailyStat
+    from app.backend.models.crash_log import CrashLog
+    apply_storage_profile(logger)
     apply_migrations(logger)
     logger.info('DB initialized')
 
+def apply_storage_profile(logger:Logger):
+    """
+    Switches the journal mode and the auto vacuum mode of a SQLite database. Unlike the other pragmas, they are stored in the database file
+    """
+    if not is_sqlite(DB_URI) or is_sqlite_memory(DB_URI):
+        return
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        # Read before the journal mode is set, which writes the header of a new database
+        is_new = conn.execute(text('PRAGMA page_count')).scalar() == 0
+        auto_vacuum = conn.execute(text('PRAGMA auto_vacuum')).scalar()
+        target = DB_AUTO_VACUUM or ('INCREMENTAL' if is_new else None)
+
+        if target is not None and AUTO_VACUUM_MODES.get(target, auto_vacuum) != auto_vacuum:
+            conn.execute(text(f'PRAGMA auto_vacuum={target}'))
+            auto_vacuum = AUTO_VACUUM_MODES[target]
+
+            # The mode of an existing database only changes with a full VACUUM, which holds the write lock until it is done
+            if not is_new:
+                logger.warning(f"Switching the database auto vacuum mode to {target}: the database is rewritten, this may take a while on a large database")
+                conn.execute(text('VACUUM'))
+
+        journal_mode = conn.execute(text(f'PRAGMA journal_mode={DB_JOURNAL_MODE}')).scalar()
+
+    auto_vacuum_mode = next((mode for mode, value in AUTO_VACUUM_MODES.items() if value == auto_vacuum), auto_vacuum)
+    logger.info(f"SQLite storage profile: journal_mode={journal_mode}, auto_vacuum={auto_vacuum_mode}, synchronous={DB_SYNCHRONOUS}, mmap_size={DB_MMAP_SIZE}, cache_size={DB_CACHE_SIZE}, busy_timeout={DB_BUSY_TIMEOUT}ms")
+
+def database_size() -> int | None:
+    """
+    Size of a SQLite database, in bytes, without its free pages. None for other backends
+    """
+    if not is_sqlite(DB_URI) or is_sqlite_memory(DB_URI):
+        return None
+
+    with engine.connect() as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        page_count = conn.execute(text('PRAGMA page_count')).scalar()
+        freelist_count = conn.execute(text('PRAGMA freelist_count')).scalar()
+
+    return (page_count - freelist_count) * page_size
+
+def incremental_vacuum() -> int:
+    """
+    Gives the free pages of a SQLite database back to the file system. Returns the number of bytes released
+    """
+    if not is_sqlite(DB_URI) or is_sqlite_memory(DB_URI):
+        return 0
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        pages_before = conn.execute(text('PRAGMA page_count')).scalar()
+        # The sqlite3 driver steps a pragma returning no rows once, which only frees a single page. executescript runs it to completion
+        conn.connection.driver_connection.executescript('PRAGMA incremental_vacuum')
+        pages_after = conn.execute(text('PRAGMA page_count')).scalar()
+
+    return (pages_before - pages_after) * page_size
+
 def apply_migrations(logger:Logger):
     logger.info(f"Executing {apply_migrations.__name__}")
 
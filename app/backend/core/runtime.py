@@ -3,6 +3,10 @@ from logging import Logger
 
 from app.backend.core import Config
 from app.backend.providers import ContainerProvider
+from app.backend.core import state
+from app.backend.services import ContainerStateCache
+from app.backend.services import CrashLoopTracker
+from app.backend.services import CrashPersistenceService
 from app.backend.services import EventHandlerService
 from app.backend.services import MonitorService
 from app.backend.services import NotificationService
@@ -10,6 +14,9 @@ from app.backend.services import RestartService
 
 
 class Runtime:
+    # Seconds the API waits for the runtime loop to reset a crash loop
+    RESET_TIMEOUT = 5
+
     def __init__(self, config, logger, provider):
         self.config: Config = config
         self.logger: Logger = logger
@@ -17,26 +24,66 @@ class Runtime:
 
         self.loop = None
         self.stop_event = asyncio.Event()
+        # Event handler of the current run, if any
+        self.handler: EventHandlerService | None = None
+        # Kept across runs, so a restarted runtime doesn't forget the crash loops
+        if provider.machine in state.runtimes:
+            raise ValueError(f"Another runtime already monitors the machine {provider.machine}")
+        self.crash_loop_tracker = CrashLoopTracker(provider.machine, config)
+        state.runtimes[provider.machine] = self
     
+    def reset_crash_loop(self, container_name: str, restart: bool = False) -> tuple[bool, bool]:
+        """
+        Closes the circuit breaker of a container and cancels its scheduled trial restart. Called from the API threads.
+        Returns whether the container was tracked, and whether a restart was scheduled
+        """
+        handler, loop = self.handler, self.loop
+        if handler is None or loop is None or loop.is_closed():
+            return self.crash_loop_tracker.reset(container_name), False
+
+        future = asyncio.run_coroutine_threadsafe(handler.reset_crash_loop(container_name, restart), loop)
+        return future.result(self.RESET_TIMEOUT)
+
     def start(self):
         self.loop = asyncio.new_event_loop()
         asyncio.set_event_loop(self.loop)
-        self.loop.run_until_complete(self._run())
+        self.loop.run_until_complete(self.run())
 
-    async def _run(self):
-        restart_service = RestartService(restart_policy=self.config.restart_policy, client=self.provider, logger=self.logger)
-        notification_service = NotificationService(logger=self.logger, config=self.config)
-        handler = EventHandlerService(client=self.provider, config=self.config, restart_service=restart_service, notification_service=notification_service, logger=self.logger)
+    async def run(self):
+        """
+        Runs the runtime until it is stopped or its monitor exits. Can be awaited on a loop shared with other runtimes
+        """
+        state_cache = ContainerStateCache(client=self.provider, logger=self.logger, ttl=self.config.container_cache_ttl)
+        restart_service = RestartService(restart_policy=self.config.restart_policy, client=self.provider, state_cache=state_cache, logger=self.logger, max_concurrency=self.config.restart_concurrency)
+        notification_service = NotificationService(logger=self.logger, config=self.config, graph=restart_service.graph)
+        crash_persistence = CrashPersistenceService(config=self.config, logger=self.logger)
+        handler = EventHandlerService(client=self.provider, config=self.config, state_cache=state_cache, restart_service=restart_service, notification_service=notification_service, crash_persistence=crash_persistence, crash_loop_tracker=self.crash_loop_tracker, logger=self.logger)
 
         monitor = MonitorService(
             client=self.provider,
             config=self.config,
             handler=handler,
+            restart_service=restart_service,
+            state_cache=state_cache,
             logger=self.logger
         )
 
+        self.loop = asyncio.get_running_loop()
+        self.handler = handler
+        handler.start()
         task = asyncio.create_task(monitor.monitor())
+        stop = asyncio.create_task(self.stop_event.wait())
 
-        await self.stop_event.wait()
+        try:
+            await asyncio.wait({task, stop}, return_when=asyncio.FIRST_COMPLETED)
 
-        task.cancel()
\ No newline at end of file
+            # Surfaces the monitor error, if any, to whoever supervises this runtime
+            if task.done():
+                task.result()
+        finally:
+            self.handler = None
+            task.cancel()
+            stop.cancel()
+            handler.stop()
+            notification_service.stop()
+            await monitor.stop()
\ No newline at end of file
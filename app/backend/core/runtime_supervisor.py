@@ -0,0 +1,64 @@
+import asyncio
+from logging import Logger
+from time import monotonic
+
+from app.backend.core.runtime import Runtime
+
+
+class RuntimeSupervisor:
+    """
+    Runs several runtimes as tasks of a single event loop, restarting any runtime that stops unexpectedly
+    """
+    # Seconds to wait before restarting a runtime. Doubles on every consecutive failure, up to MAX_RESTART_DELAY
+    RESTART_DELAY = 2
+    MAX_RESTART_DELAY = 60
+
+    def __init__(self, name: str, logger: Logger):
+        self.name = name
+        self.logger = logger
+        self.runtimes: list[Runtime] = []
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    def add(self, runtime: Runtime):
+        self.runtimes.append(runtime)
+
+    def stop(self):
+        """
+        Asks every runtime to stop. Callable from any thread, the supervisor thread returns once they all stopped
+        """
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        for runtime in self.runtimes:
+            self.loop.call_soon_threadsafe(runtime.stop_event.set)
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.logger.info(f"Starting {len(self.runtimes)} runtime(s) on loop {self.name}")
+        self.loop.run_until_complete(self._run())
+
+    async def _run(self):
+        await asyncio.gather(*(self._supervise(runtime) for runtime in self.runtimes))
+
+    async def _supervise(self, runtime: Runtime):
+        delay = self.RESTART_DELAY
+
+        while not runtime.stop_event.is_set():
+            started_at = monotonic()
+
+            try:
+                await runtime.run()
+            except Exception as e:
+                runtime.logger.error(f"Runtime crashed: {e}")
+
+            if runtime.stop_event.is_set():
+                break
+
+            # A runtime that ran fine for a while starts over with the shortest delay
+            if monotonic() - started_at > self.MAX_RESTART_DELAY:
+                delay = self.RESTART_DELAY
+
+            runtime.logger.warning(f"Runtime stopped unexpectedly. Restarting it in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.MAX_RESTART_DELAY)
@@ -1,5 +1,14 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING
 from app.backend.core import Config
 from logging import Logger
 
+if TYPE_CHECKING:
+    from app.agent import AgentClient
+    from app.backend.core.runtime import Runtime
+
 config: Config | None = None
-logger: Logger | None = None
\ No newline at end of file
+logger: Logger | None = None
+agent_clients: list[AgentClient] = []
+# Runtime of each machine, by machine name
+runtimes: dict[str, Runtime] = {}
@@ -1,5 +1,6 @@
 class Event:
-    def __init__(self, type: str, id: str, name: str):
+    def __init__(self, type: str, id: str, name: str, attributes: dict | None = None):
         self.type = type
         self.container_id = id
-        self.container_name = name
\ No newline at end of file
+        self.container_name = name
+        self.attributes = attributes or {}
\ No newline at end of file
@@ -1 +1,2 @@
-from .container_proxy import ContainerProxy
\ No newline at end of file
+from .container_proxy import ContainerProxy
+from .dependency_graph import DependencyGraph
\ No newline at end of file
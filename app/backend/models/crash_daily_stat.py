@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Date, Integer, String
+from app.backend.core.database import Base
+
+
+class CrashDailyStat(Base):
+    __tablename__ = 'crash_daily_stats'
+
+    crash_date = Column(Date, primary_key=True)
+    machine = Column(String(100), primary_key=True)
+    container_name = Column(String(100), primary_key=True)
+    # Id of the last container with this name that crashed on that day
+    container_id = Column(String(100))
+    crash_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<CrashDailyStat(date='{self.crash_date}', machine='{self.machine}', name='{self.container_name}', count={self.crash_count})>"
@@ -0,0 +1,31 @@
+import hashlib
+import zlib
+from sqlalchemy import Column, Integer, LargeBinary, String
+from app.backend.core.database import Base
+
+
+class CrashLog(Base):
+    """
+    Log snapshot of one or more crashes, stored once per distinct content and zlib-compressed
+    """
+    __tablename__ = 'crash_logs'
+
+    hash = Column(String(64), primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+    # Size of the uncompressed logs, in bytes
+    size = Column(Integer, nullable=False)
+
+    @staticmethod
+    def hash_of(logs: str) -> str:
+        return hashlib.sha256(logs.encode()).hexdigest()
+
+    @staticmethod
+    def compress(logs: str) -> bytes:
+        return zlib.compress(logs.encode(), 6)
+
+    @staticmethod
+    def decompress(data: bytes | None) -> str | None:
+        return zlib.decompress(data).decode() if data is not None else None
+
+    def __repr__(self):
+        return f"<CrashLog(hash='{self.hash[:12]}', size={self.size})>"
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from app.backend.core.database import Base
 
 
@@ -8,9 +8,16 @@ class CrashedContainer(Base):
     id = Column(Integer, primary_key=True)
     container_id = Column(String(100))
     container_name = Column(String(100))
-    logs = Column(String(5000), nullable=True)
+    logs_hash = Column(String(64), ForeignKey('crash_logs.hash'), nullable=True)
     crashedon = Column(DateTime, nullable=False)
     machine = Column(String(100), nullable=True)
+
+    __table_args__ = (
+        Index('ix_crashedcontainers_crashedon', 'crashedon'),
+        Index('ix_crashedcontainers_machine_crashedon', 'machine', 'crashedon'),
+        Index('ix_crashedcontainers_container_name_crashedon', 'container_name', 'crashedon'),
+        Index('ix_crashedcontainers_logs_hash', 'logs_hash'),
+    )
  
     def __repr__(self):
         return f"<CrashedContainer(name= '{self.container_name}', containerId='{self.container_id}')>"
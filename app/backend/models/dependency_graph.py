@@ -0,0 +1,144 @@
+from __future__ import annotations
+from typing import Iterable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.backend.models import ContainerProxy
+
+
+class DependencyGraph:
+    """
+    Container dependency graph built from the dependency label, keyed by container name.
+    Keeps both parent -> children and child -> parents edges so lookups in either direction are O(1)
+    """
+    # Label a container declares its parents with, as a comma separated list of container names
+    DEPENDS_ON_LABEL = "com.monitor.depends.on"
+
+    def __init__(self, label: str):
+        self.label = label
+        self.loaded = False
+        self.children: dict[str, set[str]] = {}
+        self.parents: dict[str, set[str]] = {}
+        self._order: list[str] | None = None
+        self._cyclic: set[str] = set()
+
+    def load(self, containers: Iterable[ContainerProxy]):
+        self.children.clear()
+        self.parents.clear()
+
+        for container in containers:
+            self.add_container(container.name, container.labels)
+
+        self.loaded = True
+
+    def add_container(self, name: str, labels: dict | None):
+        """
+        Adds the edges declared by the container label. Declaring a parent that doesn't exist yet is allowed
+        """
+        self.remove_container(name)
+        depends_on = (labels or {}).get(self.label)
+
+        if not depends_on:
+            return
+
+        for parent in (p.strip() for p in depends_on.split(",")):
+            if not parent:
+                continue
+            self.children.setdefault(parent, set()).add(name)
+            self.parents.setdefault(name, set()).add(parent)
+
+        self._order = None
+
+    def remove_container(self, name: str):
+        """
+        Drops the edges declared by the container. Edges declared by its children are kept, since they point to a name
+        which a new container may take over
+        """
+        for parent in self.parents.pop(name, set()):
+            children = self.children.get(parent)
+            if children is None:
+                continue
+            children.discard(name)
+            if not children:
+                del self.children[parent]
+
+        self._order = None
+
+    def rename_container(self, old_name: str, new_name: str, labels: dict | None):
+        self.remove_container(old_name)
+        self.add_container(new_name, labels)
+
+    def parents_of(self, name: str) -> set[str]:
+        return self.parents.get(name, set())
+
+    def children_of(self, name: str) -> set[str]:
+        return self.children.get(name, set())
+
+    def descendants(self, name: str) -> set[str]:
+        seen: set[str] = set()
+        stack = [name]
+
+        while stack:
+            for child in self.children_of(stack.pop()):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+
+        seen.discard(name)
+        return seen
+
+    def ancestors(self, name: str) -> set[str]:
+        seen: set[str] = set()
+        stack = [name]
+
+        while stack:
+            for parent in self.parents_of(stack.pop()):
+                if parent not in seen:
+                    seen.add(parent)
+                    stack.append(parent)
+
+        seen.discard(name)
+        return seen
+
+    def roots_of(self, name: str) -> set[str]:
+        """
+        Ancestors of the container (or the container itself) that depend on nothing. Containers sharing a root belong to the
+        same dependency subgraph. A container whose ancestors all sit in a cycle gets the whole cycle as roots
+        """
+        lineage = self.ancestors(name) | {name}
+        roots = {node for node in lineage if not self.parents_of(node)}
+        return roots or lineage
+
+    def topological_order(self) -> list[str]:
+        """
+        Parents before children. Computed with Kahn's algorithm and cached until the graph changes.
+        Nodes that are part of a cycle can't be ordered and are appended at the end
+        """
+        if self._order is not None:
+            return self._order
+
+        nodes = set(self.children) | set(self.parents)
+        in_degree = {node: len(self.parents_of(node)) for node in nodes}
+        level = sorted(node for node, degree in in_degree.items() if degree == 0)
+        order: list[str] = []
+
+        while level:
+            order.extend(level)
+            next_level = []
+            for node in level:
+                for child in self.children_of(node):
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        next_level.append(child)
+            level = sorted(next_level)
+
+        self._cyclic = nodes - set(order)
+        self._order = order + sorted(self._cyclic)
+        return self._order
+
+    @property
+    def cyclic_nodes(self) -> set[str]:
+        self.topological_order()
+        return self._cyclic
+
+    def __repr__(self):
+        return f"<DependencyGraph({ {parent: sorted(children) for parent, children in self.children.items()} })>"
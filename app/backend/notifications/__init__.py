@@ -1 +1,2 @@
-from .apprise_client import AppriseClient
\ No newline at end of file
+from .notification_dispatcher import NotificationChannel, NotificationDispatcher
+from .notification_template import LazyContext, NotificationTemplate
\ No newline at end of file
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import asyncio
+import atexit
+from logging import Logger
+from threading import Event as ThreadEvent, Lock, Thread
+from typing import Callable, TYPE_CHECKING
+from apprise import Apprise
+
+if TYPE_CHECKING:
+    from app.backend.core import Config
+
+
+# Builds the title and body of a notification for the channel it is sent to
+Render = Callable[["NotificationChannel"], tuple[str, str]]
+
+
+class NotificationChannel:
+    """
+    A single notification URL, with its own queue and worker so a slow or failing channel never holds back the others
+    """
+
+    def __init__(self, name: str, url: str, queue_size: int):
+        self.name = name
+        self.scheme = url.split('://', 1)[0].lower()
+        self.apprise_client = Apprise()
+        self.apprise_client.add(url)
+        self.queue: asyncio.Queue[Render] = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+        # Exposed to the notification templates, to truncate and escape per channel
+        service = self.apprise_client[0] if len(self.apprise_client) else None
+        self.body_maxlen: int = getattr(service, "body_maxlen", 0)
+        self.title_maxlen: int = getattr(service, "title_maxlen", 0)
+        self.body_format: str = self._body_format(service)
+
+    @staticmethod
+    def _body_format(service) -> str:
+        if service is None:
+            return "text"
+
+        # Services supporting several formats declare them all, the first one being their default
+        body_format = service.resolve_format() if hasattr(service, "resolve_format") else service.notify_format
+        return str(getattr(body_format, "value", body_format))
+
+
+class NotificationDispatcher:
+    """
+    Sends the notifications of every runtime from a dedicated event loop, so runtimes only hand them over and move on.
+    Each channel is sent to by its own worker, with a timeout and a few retries
+    """
+    _instance = None
+    _lock = Lock()
+    # Seconds between two attempts at sending a notification. Doubles on every attempt
+    RETRY_DELAY = 2
+    # Seconds to wait for the queued notifications to be sent when the process exits
+    SHUTDOWN_TIMEOUT = 10
+
+    def __new__(cls, config: Config, logger: Logger):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance.logger = logger
+                instance.timeout = config.notification_timeout
+                instance.retries = max(config.notification_retries, 0)
+                instance.queue_size = config.notification_queue_size
+                instance.urls = config.notification_urls
+                instance.channels: list[NotificationChannel] = []
+                instance.loop = asyncio.new_event_loop()
+                instance.ready = ThreadEvent()
+                instance.thread = Thread(target=instance._run, name="notifications", daemon=True)
+                instance.thread.start()
+                instance.ready.wait()
+                atexit.register(instance.stop)
+                cls._instance = instance
+
+            return cls._instance
+
+    def send(self, title: str, body: str):
+        """
+        Queues a notification on every channel. Never blocks: a channel whose queue is full drops it
+        """
+        self.send_rendered(lambda channel: (title, body))
+
+    def send_rendered(self, render: Render):
+        """
+        Queues a notification rendered by each channel worker right before it is sent
+        """
+        self.loop.call_soon_threadsafe(self._enqueue, render)
+
+    def stats(self) -> list[dict]:
+        return [
+            {"channel": channel.name, "queued": channel.queue.qsize(), "sent": channel.sent, "failed": channel.failed, "dropped": channel.dropped}
+            for channel in self.channels
+        ]
+
+    def stop(self):
+        """
+        Waits for the queued notifications to be sent, up to SHUTDOWN_TIMEOUT seconds, then stops the dispatcher loop
+        """
+        if not self.loop.is_running():
+            return
+
+        future = asyncio.run_coroutine_threadsafe(self._drain(), self.loop)
+        try:
+            future.result(self.SHUTDOWN_TIMEOUT)
+        except Exception:
+            self.logger.warning(f"Notifications still queued after {self.SHUTDOWN_TIMEOUT}s were not sent")
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+
+        for index, url in enumerate(self.urls):
+            # The URL holds credentials, only its scheme is logged
+            channel = NotificationChannel(f"{url.split('://', 1)[0]}#{index}", url, self.queue_size)
+            self.channels.append(channel)
+            self.loop.create_task(self._worker(channel))
+
+        self.loop.call_soon(self.ready.set)
+        self.loop.run_forever()
+
+    def _enqueue(self, render: Render):
+        for channel in self.channels:
+            try:
+                channel.queue.put_nowait(render)
+            except asyncio.QueueFull:
+                channel.dropped += 1
+                self.logger.warning(f"Notification queue of channel {channel.name} is full, dropping a notification")
+
+    async def _worker(self, channel: NotificationChannel):
+        while True:
+            render = await channel.queue.get()
+
+            try:
+                title, body = render(channel)
+            except Exception as e:
+                channel.failed += 1
+                self.logger.error(f"Unable to render a notification for {channel.name}. Error: {e}")
+                channel.queue.task_done()
+                continue
+
+            try:
+                if await self._send(channel, title, body):
+                    channel.sent += 1
+                    self.logger.info(f"Notification sent to {channel.name}")
+                else:
+                    channel.failed += 1
+                    self.logger.error(f"Unable to send a notification to {channel.name} after {self.retries + 1} attempt(s)")
+            finally:
+                channel.queue.task_done()
+
+    async def _send(self, channel: NotificationChannel, title: str, body: str) -> bool:
+        delay = self.RETRY_DELAY
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(delay)
+                delay *= 2
+
+            try:
+                if await asyncio.wait_for(channel.apprise_client.async_notify(body=body, title=title), timeout=self.timeout):
+                    return True
+                self.logger.warning(f"Channel {channel.name} rejected the notification (attempt {attempt + 1})")
+            except TimeoutError:
+                self.logger.warning(f"Channel {channel.name} did not answer within {self.timeout}s (attempt {attempt + 1})")
+            except Exception as e:
+                self.logger.warning(f"Channel {channel.name} failed: {e} (attempt {attempt + 1})")
+
+        return False
+
+    async def _drain(self):
+        await asyncio.gather(*(channel.queue.join() for channel in self.channels))
@@ -0,0 +1,117 @@
+from __future__ import annotations
+import re
+from functools import lru_cache
+from string import Formatter
+from typing import Any, Callable, Mapping, TYPE_CHECKING
+from jinja2 import StrictUndefined, meta, pass_context
+from jinja2.sandbox import SandboxedEnvironment
+from markupsafe import escape
+
+if TYPE_CHECKING:
+    from app.backend.notifications import NotificationChannel
+
+
+class LazyContext(Mapping[str, Any]):
+    """
+    Template context whose values may be callables, evaluated on first access only. Expensive fields (cleaned logs) are
+    only computed when a template references them
+    """
+
+    def __init__(self, values: dict[str, Any]):
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._values[key]
+        if callable(value):
+            value = self._values[key] = value()
+        return value
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+
+class NotificationTemplate:
+    """
+    Notification title or body compiled once. Knows the fields it references, so only those are computed when rendering.
+    A template referencing 'channel' is rendered for every notification channel
+    """
+    FORMAT = "format"
+    JINJA = "jinja"
+    MARKDOWN_SPECIAL = re.compile(r'([\\`*_\[\]()#+\-.!|>~])')
+
+    def __init__(self, source: str, fields: frozenset[str], render: Callable[[dict[str, Any]], str]):
+        self.source = source
+        self.fields = fields
+        self.per_channel = "channel" in fields
+        self._render = render
+
+    @classmethod
+    @lru_cache(maxsize=64)
+    def compile(cls, source: str, engine: str = FORMAT) -> NotificationTemplate:
+        """
+        Compiled templates are shared by every runtime
+        """
+        if engine == cls.JINJA:
+            environment = cls._environment()
+            template = environment.from_string(source)
+            fields = frozenset(meta.find_undeclared_variables(environment.parse(source)))
+            return cls(source, fields, template.render)
+
+        if engine != cls.FORMAT:
+            raise ValueError(f"Unknown notification template engine '{engine}'. Expected '{cls.FORMAT}' or '{cls.JINJA}'")
+
+        fields = frozenset(re.split(r'[.\[]', field, maxsplit=1)[0] for _, field, _, _ in Formatter().parse(source) if field)
+        return cls(source, fields, source.format_map)
+
+    def values(self, context: Mapping[str, Any]) -> dict[str, Any]:
+        """
+        Evaluates the fields this template references. Rendering the values doesn't need the context anymore
+        """
+        return {field: context[field] for field in self.fields if field in context}
+
+    def render(self, values: dict[str, Any], channel: NotificationChannel | None = None) -> str:
+        if self.per_channel:
+            values = {**values, "channel": channel}
+        return self._render(values)
+
+    @staticmethod
+    @lru_cache(maxsize=1)
+    def _environment() -> SandboxedEnvironment:
+        # Templates come from the configuration: sandboxed, and undefined fields fail like they do with str.format
+        environment = SandboxedEnvironment(undefined=StrictUndefined, autoescape=False, keep_trailing_newline=True)
+        environment.filters["tail"] = NotificationTemplate._tail
+        environment.filters["channel_escape"] = NotificationTemplate._channel_escape
+        environment.filters["markdown_escape"] = NotificationTemplate._markdown_escape
+        return environment
+
+    @staticmethod
+    def _tail(value: Any, length: int) -> str:
+        """
+        Keeps the end of the value, the most recent logs being the last ones
+        """
+        value = str(value)
+        if length <= 0 or len(value) <= length:
+            return value
+        return '…' + value[len(value) - length + 1:]
+
+    @staticmethod
+    def _markdown_escape(value: Any) -> str:
+        return NotificationTemplate.MARKDOWN_SPECIAL.sub(r'\\\1', str(value))
+
+    @staticmethod
+    @pass_context
+    def _channel_escape(context, value: Any) -> str:
+        """
+        Escapes the value for the format of the channel it is rendered for
+        """
+        channel = context.get("channel")
+        body_format = channel.body_format if channel is not None else None
+
+        if body_format == "html":
+            return str(escape(value))
+        if body_format == "markdown":
+            return NotificationTemplate._markdown_escape(value)
+        return str(value)
@@ -1,3 +1,3 @@
-from .container_provider import ContainerProvider
+from .container_provider import ContainerProvider, RestartPlanUnsupported
 from .docker_client_provider import DockerClientProvider
 from .agent_client_provider import AgentClientProvider
\ No newline at end of file
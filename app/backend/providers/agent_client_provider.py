@@ -1,15 +1,21 @@
-from typing import AsyncIterator
+from typing import AsyncIterator, Iterable
+
+import httpx
 
 from app.agent import AgentClient
 from app.backend.events import Event
 from app.backend.models import ContainerProxy
-from app.backend.providers import ContainerProvider
+from app.backend.providers.container_provider import ContainerProvider, RestartPlanUnsupported
+from app.backend.schemas.restart_plan_schema import RestartPlan, RestartProgress
 
 
 class AgentClientProvider(ContainerProvider):
 
     def __init__(self, client:AgentClient):
         super().__init__(client)
+        self.supports_restart_plan = True
+        # Same as the machine the crashes are stored with: an agent without name stands for the server
+        self.machine = client.name or ContainerProvider.SERVER_MACHINE
 
     async def get_container(self, id: str):
         container = await self.client.get_container(id)
@@ -25,9 +31,21 @@ class AgentClientProvider(ContainerProvider):
     async def get_logs(self, id: str, logs_amount: int):
         return await self.client.get_container_logs(id, logs_amount)
     
-    async def stream_events(self) -> AsyncIterator[Event]:
-        async for raw in self.client.stream_events():
+    async def run_restart_plan(self, plan: RestartPlan) -> AsyncIterator[RestartProgress]:
+        try:
+            async for progress in self.client.run_restart_plan(plan.model_dump()):
+                yield RestartProgress(**progress)
+        except httpx.HTTPStatusError as e:
+            # Agents older than the restart plan endpoint answer 404: stop trying and restart container by container
+            if e.response.status_code == 404:
+                self.supports_restart_plan = False
+                raise RestartPlanUnsupported("The agent does not support restart plans")
+            raise
+
+    async def stream_events(self, actions: Iterable[str] | None = None) -> AsyncIterator[Event]:
+        async for raw in self.client.stream_events(actions):
             id = ''
+            attributes = raw.get("Actor", {}).get("Attributes", {})
 
             if 'id' in raw:
                 id = raw['id']
@@ -37,5 +55,6 @@ class AgentClientProvider(ContainerProvider):
             yield Event(
                 type = raw.get("Action", ''),
                 id = id,
-                name = raw.get("Actor", {}).get("Attributes", {}).get("name", "")
+                name = attributes.get("name", ""),
+                attributes = attributes
             )
\ No newline at end of file
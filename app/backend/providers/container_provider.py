@@ -1,14 +1,28 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, List, TYPE_CHECKING
+from typing import AsyncIterator, Iterable, List, TYPE_CHECKING
 from app.backend.events import Event
 
 if TYPE_CHECKING:
     from app.backend.models import ContainerProxy
+    from app.backend.schemas.restart_plan_schema import RestartPlan, RestartProgress
     from app.agent.agent_client import AgentClient
     from docker import DockerClient
 
+class RestartPlanUnsupported(Exception):
+    """
+    The provider can't run restart plans: its containers are restarted one by one instead
+    """
+
+
 class ContainerProvider(ABC):
+    # Machine name of the local docker daemon. Reserved: no agent can be named after it
+    SERVER_MACHINE = "Server"
+
+    # Whether the provider can run a whole restart plan remotely, see run_restart_plan
+    supports_restart_plan: bool = False
+    # Name of the machine the containers run on, as stored with their crashes. Unique across providers
+    machine: str = SERVER_MACHINE
 
     def __init__(self, client: DockerClient | AgentClient):
         self.client = client
@@ -30,5 +44,15 @@ class ContainerProvider(ABC):
         pass
 
     @abstractmethod
-    def stream_events(self) -> AsyncIterator[Event] :
-        pass
\ No newline at end of file
+    def stream_events(self, actions: Iterable[str] | None = None) -> AsyncIterator[Event] :
+        """
+        Streams container events. When actions are given, only events with those actions are requested from the source
+        """
+        pass
+
+    def run_restart_plan(self, plan: RestartPlan) -> AsyncIterator[RestartProgress]:
+        """
+        Runs a restart plan in a single round trip and streams back the progress of each container.
+        Raises RestartPlanUnsupported when the provider cannot run restart plans
+        """
+        raise RestartPlanUnsupported("The provider does not support restart plans")
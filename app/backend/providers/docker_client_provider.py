@@ -1,45 +1,107 @@
 # type: ignore # Solves lint errors on client attribute functions
 
-from typing import AsyncIterator
+import asyncio
+from threading import Event as ThreadEvent, Thread
+from typing import AsyncIterator, Iterable
 
 from docker import DockerClient
 
 from app.backend.events import Event
 from app.backend.models import ContainerProxy
 from app.backend.providers import ContainerProvider
+from app.backend.providers.docker_executor import DockerExecutor
+from app.backend.utils.log_tailer import LogTailer
 
 
 class DockerClientProvider(ContainerProvider):
+    # Max number of raw docker events buffered between the reader thread and the event loop
+    EVENTS_QUEUE_SIZE = 500
 
-    def __init__(self, client:DockerClient):
+    def __init__(self, client:DockerClient, executor:DockerExecutor, log_tailer:LogTailer | None = None):
         super().__init__(client)
+        self.executor = executor
+        self.log_tailer = log_tailer
 
     async def get_container(self, id: str):
-        container = self.client.containers.get(id)
+        container = await self.executor.run("get", self.client.containers.get, id)
         return ContainerProxy.from_docker(container, self)
 
     async def list_containers(self):
-        containers = self.client.containers(all=True)
+        containers = await self.executor.run("list", self.client.containers.list, all=True)
         return list(ContainerProxy.from_docker(c, self) for c in containers)
 
     async def restart_container(self, id: str):
-        container = self.client.containers.get(id)
-        return container.restart()
-    
+        return await self.executor.run("restart", lambda: self.client.containers.get(id).restart())
+
     async def get_logs(self, id: str, logs_amount: int):
-        return self.client.containers.get(id).logs(tail = logs_amount).decode('utf8', errors='ignore')
-    
-    async def stream_events(self) -> AsyncIterator[Event]:
-        for raw in self.client.events(decode=True):
-            id = ''
-
-            if 'id' in raw:
-                id = raw['id']
-            elif 'Actor' in raw and 'ID' in raw['Actor']:
-                id = raw['Actor']['ID']
-
-            yield Event(
-                type = raw.get("Action", ''),
-                id = id,
-                name=raw.get("Actor", {}).get("Attributes", {}).get("name", '')
-            )
\ No newline at end of file
+        if self.log_tailer is not None:
+            logs = await self.executor.run("logs", self.log_tailer.snapshot, id, logs_amount)
+            if logs is not None:
+                return logs
+
+        logs = await self.executor.run("logs", lambda: self.client.containers.get(id).logs(tail = logs_amount))
+        return logs.decode('utf8', errors='ignore')
+
+    async def stream_events(self, actions: Iterable[str] | None = None) -> AsyncIterator[Event]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.EVENTS_QUEUE_SIZE)
+        filters = {"type": "container"}
+
+        if actions:
+            filters["event"] = list(actions)
+
+        events = self.client.events(decode=True, filters=filters)
+        stopped = ThreadEvent()
+        done = object()
+
+        def read_events():
+            """
+            Reads the blocking docker events generator on a dedicated thread and hands every event over to the loop.
+            Waiting on the put keeps the queue bounded: when the consumer lags behind, the reader stops pulling from the socket
+            """
+            try:
+                for raw in events:
+                    if stopped.is_set():
+                        return
+                    asyncio.run_coroutine_threadsafe(queue.put(raw), loop).result()
+                item = done
+            except Exception as e:
+                item = e
+
+            if not stopped.is_set() and not loop.is_closed():
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+
+        reader = Thread(target=read_events, name="docker-events-reader", daemon=True)
+        reader.start()
+
+        try:
+            while True:
+                raw = await queue.get()
+
+                if raw is done:
+                    break
+
+                if isinstance(raw, Exception):
+                    raise raw
+
+                id = ''
+                attributes = raw.get("Actor", {}).get("Attributes", {})
+
+                if 'id' in raw:
+                    id = raw['id']
+                elif 'Actor' in raw and 'ID' in raw['Actor']:
+                    id = raw['Actor']['ID']
+
+                yield Event(
+                    type = raw.get("Action", ''),
+                    id = id,
+                    name = attributes.get("name", ''),
+                    attributes = attributes
+                )
+        finally:
+            # Closing the stream shuts the underlying HTTP response down, which unblocks the reader thread.
+            # Draining the queue releases a reader that is waiting on a full queue
+            stopped.set()
+            events.close()
+            while not queue.empty():
+                queue.get_nowait()
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from logging import Logger
+from time import perf_counter
+from typing import Any, Callable, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from app.backend.core import Config
+
+
+@dataclass
+class OperationLimits:
+    timeout: float
+    concurrency: int
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    started: int = 0
+    failures: int = 0
+    timeouts: int = 0
+    queued: int = 0
+    in_flight: int = 0
+    max_queued: int = 0
+    total_wait: float = 0.0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "queued": self.queued,
+            "in_flight": self.in_flight,
+            "max_queued": self.max_queued,
+            "avg_wait": self.total_wait / self.started if self.started else 0.0,
+            "avg_latency": self.total_latency / self.calls if self.calls else 0.0,
+            "max_latency": self.max_latency
+        }
+
+
+class DockerExecutor:
+    """
+    Runs blocking docker SDK calls on a bounded thread pool so they never block the runtime loop.
+    Every operation has its own timeout and concurrency limit
+    """
+
+    def __init__(self, max_workers: int, limits: dict[str, OperationLimits], logger: Logger | None = None):
+        self.logger = logger
+        self.limits = limits
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="docker-call")
+        self.semaphores = {operation: asyncio.Semaphore(limit.concurrency) for operation, limit in limits.items()}
+        self.operation_stats = {operation: OperationStats() for operation in limits}
+
+    @classmethod
+    def from_config(cls, config: Config, logger: Logger | None = None) -> DockerExecutor:
+        workers = config.docker_executor_workers
+
+        return cls(
+            max_workers=workers,
+            limits={
+                "get": OperationLimits(timeout=config.docker_call_timeout, concurrency=workers),
+                "list": OperationLimits(timeout=config.docker_call_timeout, concurrency=workers),
+                "logs": OperationLimits(timeout=config.docker_call_timeout, concurrency=workers),
+                "restart": OperationLimits(timeout=config.docker_restart_timeout, concurrency=config.docker_restart_concurrency)
+            },
+            logger=logger
+        )
+
+    async def run(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        limit = self.limits[operation]
+        semaphore = self.semaphores[operation]
+        stats = self.operation_stats[operation]
+        loop = asyncio.get_running_loop()
+
+        # Everything between the call and the moment the thread picks the job up counts as queueing.
+        # The stats are only updated on the loop: the pool threads hand their updates over with call_soon_threadsafe
+        submitted_at = perf_counter()
+        deadline = submitted_at + limit.timeout
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        started = False
+
+        def on_start(started_at: float):
+            nonlocal started
+            started = True
+            stats.queued -= 1
+            stats.in_flight += 1
+            stats.started += 1
+            stats.total_wait += started_at - submitted_at
+
+        def on_done():
+            # The thread cannot be interrupted, so the slot is only given back once the call has really returned
+            semaphore.release()
+            if started:
+                stats.in_flight -= 1
+
+        def call():
+            self._call_soon(loop, on_start, perf_counter())
+            return fn(*args, **kwargs)
+
+        try:
+            # Waiting for a free slot counts against the operation timeout as well
+            await asyncio.wait_for(semaphore.acquire(), timeout=limit.timeout)
+        except BaseException as e:
+            stats.queued -= 1
+            stats.calls += 1
+            if isinstance(e, TimeoutError):
+                stats.timeouts += 1
+                raise TimeoutError(f"Docker operation '{operation}' timed out after waiting {limit.timeout}s for a free slot")
+            raise
+
+        job = self.pool.submit(call)
+        job.add_done_callback(lambda _: self._call_soon(loop, on_done))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(job)), timeout=max(deadline - perf_counter(), 0))
+        except TimeoutError:
+            stats.timeouts += 1
+            raise TimeoutError(f"Docker operation '{operation}' timed out after {limit.timeout}s")
+        except Exception:
+            stats.failures += 1
+            raise
+        finally:
+            # Only succeeds while no thread picked the job up
+            if job.cancel():
+                stats.queued -= 1
+
+            latency = perf_counter() - submitted_at
+            stats.calls += 1
+            stats.total_latency += latency
+            stats.max_latency = max(stats.max_latency, latency)
+
+            if self.logger:
+                self.logger.debug(f"Docker operation '{operation}' took {latency:.3f}s ({stats.queued} queued, {stats.in_flight} in flight)")
+
+    @staticmethod
+    def _call_soon(loop: asyncio.AbstractEventLoop, callback: Callable[..., Any], *args):
+        try:
+            loop.call_soon_threadsafe(callback, *args)
+        except RuntimeError:
+            # The loop is closed: nobody reads the stats anymore
+            pass
+
+    def stats(self) -> dict[str, dict]:
+        return {operation: stats.as_dict() for operation, stats in self.operation_stats.items()}
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
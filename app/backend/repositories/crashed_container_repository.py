@@ -1,83 +1,156 @@
-from datetime import datetime
+from datetime import datetime, time, timedelta
 from logging import Logger
-from sqlalchemy import and_, func
-from app.backend.core.database import SessionLocal
-from app.backend.schemas.crashed_container_schema import CrashedContainerBase, CrashedContainerLogs
+from typing import Iterator
+from sqlalchemy import and_, delete, exists, func, insert, or_, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from app.backend.core.database import ReadSessionLocal, SessionLocal
+from app.backend.schemas.crashed_container_schema import CrashedContainerItem, CrashedContainerLogs
 from app.backend.models.crashed_container import CrashedContainer
+from app.backend.models.crash_daily_stat import CrashDailyStat
+from app.backend.models.crash_log import CrashLog
 from app.backend.schemas.chart_stats_schema import ChartStats
 
 
 class CrashedContainerRepository:
 
     @staticmethod
-    def add_crashed_container(ct_crashed:CrashedContainerBase, logger:Logger):
-        with SessionLocal() as db:      
-            crashed_container = CrashedContainer(
-                logs = ct_crashed.logs,
-                crashedon = datetime.now(),
-                container_id = ct_crashed.container_id,
-                container_name = ct_crashed.container_name,
-                machine = ct_crashed.machine
-            )
-            
-            db.add(crashed_container)
+    def add_crashed_containers(crashes:list[CrashedContainerLogs], logger:Logger):
+        """
+        Inserts a batch of crashes in a single transaction
+        """
+        with SessionLocal() as db:
+            logs_hashes = CrashedContainerRepository._store_logs(db, crashes)
+            db.add_all([
+                CrashedContainer(
+                    logs_hash = logs_hashes.get(ct_crashed.logs),
+                    crashedon = ct_crashed.crashed_on,
+                    container_id = ct_crashed.container_id,
+                    container_name = ct_crashed.container_name,
+                    machine = ct_crashed.machine
+                )
+                for ct_crashed in crashes
+            ])
+            CrashedContainerRepository._increment_daily_stats(db, crashes)
             db.commit()
-            db.refresh(crashed_container)
-            
-            logger.info(f"Container {ct_crashed.container_id} added to the crashed containers table")
 
-            return crashed_container
+            logger.info(f"{len(crashes)} container(s) added to the crashed containers table")
 
     @staticmethod
-    def get_all_crashed_containers(date_from:datetime, date_to:datetime) -> list[CrashedContainerLogs]:
-        with SessionLocal() as db:
-            
-            crash_date = func.date(CrashedContainer.crashedon)
-            date_from_str = date_from.strftime("%Y-%m-%d")
-            date_to_str = date_to.strftime("%Y-%m-%d")
-            
-            
-            crashed_containers = db.query(CrashedContainer.container_id, CrashedContainer.container_name, CrashedContainer.logs, CrashedContainer.crashedon, CrashedContainer.machine).filter(crash_date >= date_from_str, crash_date <= date_to_str).order_by(CrashedContainer.crashedon.asc()).all()
+    def get_crashed_containers_page(date_from:datetime, date_to:datetime, limit:int, after:tuple[datetime, int] | None = None, include_logs:bool = True, descending:bool = False) -> list[CrashedContainerItem]:
+        """
+        Crashes ordered by (crashedon, id), or from the most recent one when descending, starting right after the given key.
+        The logs are only read and decompressed when include_logs is set
+        """
+        with ReadSessionLocal() as db:
+            columns = [CrashedContainer.id, CrashedContainer.container_id, CrashedContainer.container_name, CrashedContainer.crashedon, CrashedContainer.machine]
+            if include_logs:
+                columns.append(CrashLog.data)
+
+            query = db.query(*columns).filter(CrashedContainerRepository._crashed_between(date_from, date_to))
+            if include_logs:
+                query = query.outerjoin(CrashLog, CrashLog.hash == CrashedContainer.logs_hash)
+
+            if after is not None:
+                after_crashed_on, after_id = after
+                if descending:
+                    query = query.filter(or_(
+                        CrashedContainer.crashedon < after_crashed_on,
+                        and_(CrashedContainer.crashedon == after_crashed_on, CrashedContainer.id < after_id)
+                    ))
+                else:
+                    query = query.filter(or_(
+                        CrashedContainer.crashedon > after_crashed_on,
+                        and_(CrashedContainer.crashedon == after_crashed_on, CrashedContainer.id > after_id)
+                    ))
+
+            if descending:
+                query = query.order_by(CrashedContainer.crashedon.desc(), CrashedContainer.id.desc())
+            else:
+                query = query.order_by(CrashedContainer.crashedon.asc(), CrashedContainer.id.asc())
+
+            rows = query.limit(limit).all()
+
             return [
-                CrashedContainerLogs(
-                    container_id=container_id,
-                    container_name=container_name,
-                    crashed_on=crashed_on,
-                    logs=logs,
-                    machine = machine
+                CrashedContainerItem(
+                    id=row.id,
+                    container_id=row.container_id,
+                    container_name=row.container_name,
+                    crashed_on=row.crashedon,
+                    machine=row.machine,
+                    logs=CrashLog.decompress(row.data) if include_logs else None
                 )
-                for container_id, container_name, logs, crashed_on, machine in crashed_containers
+                for row in rows
             ]
 
+    @staticmethod
+    def iter_crashed_containers(date_from:datetime, date_to:datetime, include_logs:bool = True, chunk_size:int = 1000) -> Iterator[dict]:
+        """
+        Streams the crashes ordered by (crashedon, id), fetching chunk_size rows at a time from a server-side cursor
+        """
+        columns = [CrashedContainer.id, CrashedContainer.container_id, CrashedContainer.container_name, CrashedContainer.machine, CrashedContainer.crashedon]
+        if include_logs:
+            columns.append(CrashLog.data)
+
+        statement = select(*columns).where(CrashedContainerRepository._crashed_between(date_from, date_to))
+        if include_logs:
+            statement = statement.outerjoin(CrashLog, CrashLog.hash == CrashedContainer.logs_hash)
+
+        statement = (
+            statement
+            .order_by(CrashedContainer.crashedon.asc(), CrashedContainer.id.asc())
+            .execution_options(yield_per=chunk_size)
+        )
+
+        with ReadSessionLocal() as db:
+            for row in db.execute(statement):
+                record = {
+                    "id": row.id,
+                    "container_id": row.container_id,
+                    "container_name": row.container_name,
+                    "machine": row.machine,
+                    "crashed_on": row.crashedon
+                }
+                if include_logs:
+                    record["logs"] = CrashLog.decompress(row.data)
+                yield record
+
+    @staticmethod
+    def get_crashed_container(crash_id:int) -> CrashedContainerItem | None:
+        with ReadSessionLocal() as db:
+            crashed_container = db.get(CrashedContainer, crash_id)
+
+            if crashed_container is None:
+                return None
+
+            crash_log = db.get(CrashLog, crashed_container.logs_hash) if crashed_container.logs_hash else None
+
+            return CrashedContainerItem(
+                id=crashed_container.id,
+                container_id=crashed_container.container_id,
+                container_name=crashed_container.container_name,
+                crashed_on=crashed_container.crashedon,
+                machine=crashed_container.machine,
+                logs=CrashLog.decompress(crash_log.data) if crash_log else None
+            )
+
     @staticmethod
     def get_crashed_containers_stats_by_date(date_from:datetime, date_to:datetime):
-        with SessionLocal() as db:
-            
-            crash_date = func.date(CrashedContainer.crashedon)
-            
-            date_from_str = date_from.strftime("%Y-%m-%d")
-            date_to_str = date_to.strftime("%Y-%m-%d")
-            
+        with ReadSessionLocal() as db:
             rows = (
                 db.query(
-                    CrashedContainer.container_id,
-                    CrashedContainer.container_name, 
-                    func.count(CrashedContainer.container_id).label('crash_count'),
-                    crash_date.label("crash_date"),
-                    CrashedContainer.machine
+                    CrashDailyStat.container_id,
+                    CrashDailyStat.container_name,
+                    CrashDailyStat.crash_count,
+                    CrashDailyStat.crash_date,
+                    CrashDailyStat.machine
                 )
                 .filter(
-                    crash_date >= date_from_str,
-                    crash_date <= date_to_str
-                )
-                .group_by(
-                    crash_date,
-                    CrashedContainer.container_name,
-                    CrashedContainer.machine
+                    CrashDailyStat.crash_date >= date_from.date(),
+                    CrashDailyStat.crash_date <= date_to.date()
                 )
                 .order_by(
-                    crash_date.asc(),
-                    CrashedContainer.container_name.asc()
+                    CrashDailyStat.crash_date.asc(),
+                    CrashDailyStat.container_name.asc()
                 )
                 .all()
             )
@@ -91,4 +164,154 @@ class CrashedContainerRepository:
                     machine=machine
                 )
                 for containerid, containername, crash_count, crash_date, machine in rows
-            ]
\ No newline at end of file
+            ]
+
+    @staticmethod
+    def rebuild_daily_stats(logger:Logger) -> int:
+        """
+        Recomputes the daily crash rollup from the crashed containers table. Returns the number of rollup rows.
+        Only the days, machines and containers that still have crashes are recomputed: the counts of the crashes deleted by the
+        retention policy are kept. A day the retention policy only partly deleted is recounted from its remaining crashes
+        """
+        with SessionLocal() as db:
+            crash_date = func.date(CrashedContainer.crashedon)
+            machine = func.coalesce(CrashedContainer.machine, '')
+            container_name = func.coalesce(CrashedContainer.container_name, '')
+
+            db.execute(delete(CrashDailyStat).where(
+                tuple_(CrashDailyStat.crash_date, CrashDailyStat.machine, CrashDailyStat.container_name).in_(
+                    select(crash_date, machine, container_name).distinct()
+                )
+            ))
+            db.execute(
+                insert(CrashDailyStat).from_select(
+                    ['crash_date', 'machine', 'container_name', 'container_id', 'crash_count'],
+                    select(crash_date, machine, container_name, func.max(CrashedContainer.container_id), func.count())
+                    .group_by(crash_date, machine, container_name)
+                )
+            )
+            db.commit()
+
+            rows = db.query(func.count()).select_from(CrashDailyStat).scalar()
+            logger.info(f"Daily crash stats rebuilt: {rows} row(s)")
+            return rows
+
+    @staticmethod
+    def clear_logs_before(cutoff:datetime, machine_filter, batch_size:int) -> int:
+        """
+        Drops the logs reference of the crashes older than cutoff, batch_size rows per transaction. Returns the number of crashes updated
+        """
+        return CrashedContainerRepository._in_batches(
+            lambda ids: update(CrashedContainer).where(CrashedContainer.id.in_(ids)).values(logs_hash=None),
+            select(CrashedContainer.id).where(CrashedContainer.crashedon < cutoff, CrashedContainer.logs_hash.is_not(None), machine_filter),
+            batch_size
+        )
+
+    @staticmethod
+    def delete_before(cutoff:datetime, machine_filter, batch_size:int) -> int:
+        """
+        Deletes the crashes older than cutoff, batch_size rows per transaction. Their daily stats are kept. Returns the number of crashes deleted
+        """
+        return CrashedContainerRepository._in_batches(
+            lambda ids: delete(CrashedContainer).where(CrashedContainer.id.in_(ids)),
+            select(CrashedContainer.id).where(CrashedContainer.crashedon < cutoff, machine_filter),
+            batch_size
+        )
+
+    @staticmethod
+    def delete_orphan_logs(batch_size:int) -> int:
+        """
+        Deletes the log snapshots no crash refers to anymore. Returns the number of snapshots deleted
+        """
+        return CrashedContainerRepository._in_batches(
+            lambda hashes: delete(CrashLog).where(CrashLog.hash.in_(hashes)),
+            select(CrashLog.hash).where(~exists().where(CrashedContainer.logs_hash == CrashLog.hash)),
+            batch_size
+        )
+
+    @staticmethod
+    def machine_filter(machine:str | None, excluded:list[str]):
+        """
+        Crashes of the given machine or, when machine is None, of every machine except the excluded ones
+        """
+        if machine is not None:
+            return CrashedContainer.machine == machine
+
+        return or_(CrashedContainer.machine.is_(None), CrashedContainer.machine.not_in(excluded))
+
+    @staticmethod
+    def _in_batches(statement, keys, batch_size:int) -> int:
+        """
+        Runs statement on batch_size keys at a time, each batch in its own transaction so writers only wait for a single batch
+        """
+        total = 0
+
+        while True:
+            with SessionLocal() as db:
+                affected = db.execute(statement(keys.limit(batch_size).scalar_subquery())).rowcount
+                db.commit()
+
+            total += affected
+            if affected < batch_size:
+                return total
+
+    @staticmethod
+    def _store_logs(db, crashes:list[CrashedContainerLogs]) -> dict[str, str]:
+        """
+        Stores the distinct log snapshots of a batch of crashes that aren't stored yet. Returns the hash of each snapshot
+        """
+        hashes = {ct_crashed.logs: CrashLog.hash_of(ct_crashed.logs) for ct_crashed in crashes if ct_crashed.logs is not None}
+        if not hashes:
+            return hashes
+
+        stored = set(db.scalars(select(CrashLog.hash).where(CrashLog.hash.in_(set(hashes.values())))))
+        new_logs = {logs_hash: logs for logs, logs_hash in hashes.items() if logs_hash not in stored}
+
+        db.add_all([
+            CrashLog(hash=logs_hash, data=CrashLog.compress(logs), size=len(logs.encode()))
+            for logs_hash, logs in new_logs.items()
+        ])
+
+        return hashes
+
+    @staticmethod
+    def _increment_daily_stats(db, crashes:list[CrashedContainerLogs]):
+        """
+        Adds a batch of crashes to the daily crash rollup, within the caller's transaction
+        """
+        counts: dict[tuple, dict] = {}
+        for ct_crashed in crashes:
+            key = (ct_crashed.crashed_on.date(), ct_crashed.machine or '', ct_crashed.container_name or '')
+            stat = counts.setdefault(key, {'crash_date': key[0], 'machine': key[1], 'container_name': key[2], 'crash_count': 0})
+            stat['container_id'] = ct_crashed.container_id
+            stat['crash_count'] += 1
+
+        dialect = db.get_bind().dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            upsert = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(CrashDailyStat).values(list(counts.values()))
+            db.execute(upsert.on_conflict_do_update(
+                index_elements=['crash_date', 'machine', 'container_name'],
+                set_={
+                    'crash_count': CrashDailyStat.crash_count + upsert.excluded.crash_count,
+                    'container_id': upsert.excluded.container_id
+                }
+            ))
+            return
+
+        for key, values in counts.items():
+            stat = db.get(CrashDailyStat, key)
+            if stat is None:
+                db.add(CrashDailyStat(**values))
+            else:
+                stat.crash_count += values['crash_count']
+                stat.container_id = values['container_id']
+
+    @staticmethod
+    def _crashed_between(date_from:datetime, date_to:datetime):
+        """
+        Crashes from the start of date_from to the end of date_to, as a half-open range on the raw column so the crashedon indexes can be used
+        """
+        start = datetime.combine(date_from.date(), time.min)
+        end = datetime.combine(date_to.date() + timedelta(days=1), time.min)
+        return and_(CrashedContainer.crashedon >= start, CrashedContainer.crashedon < end)
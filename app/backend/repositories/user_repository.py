@@ -1,5 +1,5 @@
 from logging import Logger
-from app.backend.core.database import SessionLocal
+from app.backend.core.database import ReadSessionLocal, SessionLocal
 from app.backend.schemas.user_schema import User as UserSchema
 from app.backend.models.user import User
 
@@ -7,7 +7,7 @@ class UserRepository:
     
     @staticmethod
     def get_user(uid: int):
-        with SessionLocal() as db:
+        with ReadSessionLocal() as db:
             return db.query(User).filter(User.id == uid).first()
 
     @staticmethod
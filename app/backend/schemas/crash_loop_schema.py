@@ -0,0 +1,12 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+
+
+class CrashLoopState(BaseModel):
+    machine: str
+    container_name: str
+    state: str = Field(description="One of: closed (restarted normally), backoff (restarts are delayed), open (restarts are stopped), half_open (one trial restart allowed)")
+    crashes: int = Field(description="Number of crashes within the sliding window")
+    next_delay: float = Field(description="Seconds the next restart will be delayed by")
+    last_crash: datetime | None = None
+    opened_at: datetime | None = Field(default=None, description="When the circuit breaker tripped")
@@ -13,3 +13,15 @@ class CrashedContainerLogs(CrashedContainerBase):
     
 class CrashedContainerStats(CrashedContainerBase):
     crash_count:int
+
+class CrashedContainerItem(BaseModel):
+    id:int
+    container_id:str
+    container_name: str | None = None
+    machine: str | None = None
+    crashed_on:datetime
+    logs: str | None = Field(default=None, description="Only filled when the logs are requested")
+
+class CrashedContainerPage(BaseModel):
+    items: list[CrashedContainerItem]
+    next_cursor: str | None = Field(default=None, description="Cursor of the next page. Missing on the last page")
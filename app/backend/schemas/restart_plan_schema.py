@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+
+
+class RestartPlan(BaseModel):
+    tiers: list[list[str]] = Field(description="Container names to restart, tier by tier. Containers in the same tier are restarted in parallel")
+    parents: dict[str, list[str]] = Field(default_factory=dict, description="Parents of each container. A container is skipped when any of its parents did not become ready")
+    wait_ready: list[str] = Field(default_factory=list, description="Containers that must be running (and healthy, when they have a healthcheck) before their dependents are restarted")
+    ready_timeout: int = Field(default=60, description="Seconds to wait for a container to become ready")
+    max_parallel: int = Field(default=4, description="Maximum number of containers restarted at the same time")
+
+class RestartProgress(BaseModel):
+    container: str
+    status: str = Field(description="One of: restarting, restarted, ready, not_ready, skipped, failed")
+    detail: str | None = None
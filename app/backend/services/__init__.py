@@ -1,5 +1,10 @@
+from .container_state_cache import ContainerStateCache
+from .crash_loop_tracker import CrashLoopTracker
+from .crash_persistence_service import CrashPersistenceService
 from .event_handler_service import EventHandlerService
+from .export_service import ExportService
 from .monitor_service import MonitorService
 from .notification_service import NotificationService
 from .restart_service import RestartService
+from .retention_service import RetentionService
 from .stats_service import StatsService
\ No newline at end of file
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import asyncio
+import copy
+from logging import Logger
+from time import monotonic
+from typing import TYPE_CHECKING
+from app.backend.models import ContainerProxy
+
+if TYPE_CHECKING:
+    from app.backend.events import Event
+    from app.backend.providers import ContainerProvider
+
+
+class ContainerStateCache:
+    """
+    In-memory state of the containers of a runtime. Seeded by a single list_containers() call and kept
+    current from the event stream, so lookups and readiness checks don't have to inspect the container again.
+    Entries that haven't been refreshed for longer than the TTL are fetched again on read
+    """
+    # Container events that change the cached state. 'health_status' matches every health status event
+    STATE_EVENT_TYPE = {"start", "die", "health_status", "destroy", "rename"}
+    # Seconds between two provider lookups while waiting for a container to be ready, in case its events are late or lost
+    READY_FALLBACK_POLL_INTERVAL = 10
+
+    def __init__(self, client: ContainerProvider, logger: Logger, ttl: int):
+        self.client = client
+        self.logger = logger
+        self.ttl = ttl
+        self.containers: dict[str, dict] = {}
+        self.ids_by_name: dict[str, str] = {}
+        self.refreshed_at: dict[str, float] = {}
+        self.ready_waiters: dict[str, set[asyncio.Event]] = {}
+
+    async def load(self) -> list[ContainerProxy]:
+        containers = await self.client.list_containers()
+
+        self.containers.clear()
+        self.ids_by_name.clear()
+        self.refreshed_at.clear()
+
+        for container in containers:
+            self._store(container)
+
+        self.logger.debug(f"Container state cache loaded with {len(containers)} container(s)")
+        return containers
+
+    async def get_container(self, id: str, refresh: bool = False) -> ContainerProxy | None:
+        """
+        Returns the cached container, by id or name. Falls back to the provider on a miss, when the entry is older
+        than the TTL or when refresh is requested
+        """
+        container_id = id if id in self.containers else self.ids_by_name.get(id)
+
+        if container_id is not None and not refresh and monotonic() - self.refreshed_at[container_id] < self.ttl:
+            return ContainerProxy.from_dict(dict(self.containers[container_id]), self.client)
+
+        container = await self.client.get_container(id)
+
+        if container is None:
+            self.invalidate(id)
+            return None
+
+        self._store(container)
+        return container
+
+    async def wait_until_ready(self, name: str, timeout: float) -> bool:
+        """
+        Waits until the container is running and, when it has a healthcheck, healthy.
+        Wakes up on every state event of the container and only asks the provider when no event arrived for a while
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = asyncio.Event()
+        self.ready_waiters.setdefault(name, set()).add(waiter)
+        refresh = False
+
+        try:
+            while True:
+                # Cleared before the lookup, so an event arriving in the meantime wakes the next wait up right away
+                waiter.clear()
+
+                try:
+                    container = await self.get_container(name, refresh=refresh)
+                except Exception as e:
+                    self.logger.debug(f"Unable to check whether {name} is ready: {e}")
+                    container = None
+
+                if container is not None and self.is_ready(container):
+                    return True
+
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+
+                try:
+                    await asyncio.wait_for(waiter.wait(), timeout=min(remaining, self.READY_FALLBACK_POLL_INTERVAL))
+                    refresh = False
+                except TimeoutError:
+                    refresh = True
+        finally:
+            waiters = self.ready_waiters.get(name)
+            if waiters is not None:
+                waiters.discard(waiter)
+                if not waiters:
+                    del self.ready_waiters[name]
+
+    @staticmethod
+    def is_ready(container: ContainerProxy) -> bool:
+        # A container health status is unknown when there's no healthcheck for it
+        return container.status == "running" and container.health_status in ("healthy", "unknown")
+
+    def invalidate(self, id: str):
+        """
+        Drops a container from the cache, forcing the next lookup to ask the provider
+        """
+        container_id = id if id in self.containers else self.ids_by_name.get(id)
+
+        if container_id is None:
+            return
+
+        data = self.containers.pop(container_id)
+        self.refreshed_at.pop(container_id, None)
+
+        if self.ids_by_name.get(data.get("name", "")) == container_id:
+            del self.ids_by_name[data["name"]]
+
+    def apply_event(self, event: Event):
+        container_id = event.container_id if event.container_id in self.containers else self.ids_by_name.get(event.container_name)
+
+        # Containers that were never looked up are fetched on their first read
+        if container_id is None:
+            return
+
+        if event.type == "destroy":
+            self.invalidate(container_id)
+            return
+
+        data = self.containers[container_id]
+        state = data.setdefault("state", {})
+
+        if event.type == "start":
+            data["status"] = state["Status"] = "running"
+            state["Running"] = True
+            # A container with a healthcheck goes back to 'starting' until its first check passes
+            if data.get("health_status", "unknown") != "unknown":
+                data["health_status"] = data.setdefault("health", {})["Status"] = "starting"
+        elif event.type == "die":
+            data["status"] = state["Status"] = "exited"
+            state["Running"] = False
+            exit_code = event.attributes.get("exitCode")
+            if exit_code is not None:
+                data["exit_code"] = state["ExitCode"] = int(exit_code)
+        elif event.type.startswith("health_status:"):
+            data["health_status"] = data.setdefault("health", {})["Status"] = event.type.split(":", 1)[1].strip()
+        elif event.type == "rename":
+            if self.ids_by_name.get(data.get("name", "")) == container_id:
+                del self.ids_by_name[data["name"]]
+            data["name"] = event.container_name
+            self.ids_by_name[event.container_name] = container_id
+        else:
+            return
+
+        self.refreshed_at[container_id] = monotonic()
+
+        for waiter in self.ready_waiters.get(data.get("name", ""), ()):
+            waiter.set()
+
+    def _store(self, container: ContainerProxy):
+        # apply_event changes the nested state and health dicts in place: they must not be shared with the provider's container
+        data = copy.deepcopy(container._data)
+
+        self.invalidate(container.id)
+        self.containers[container.id] = data
+        self.ids_by_name[container.name] = container.id
+        self.refreshed_at[container.id] = monotonic()
@@ -0,0 +1,166 @@
+from __future__ import annotations
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from time import time
+from typing import TYPE_CHECKING
+from app.backend.schemas.crash_loop_schema import CrashLoopState
+
+if TYPE_CHECKING:
+    from app.backend.core import Config
+
+
+@dataclass
+class CrashDecision:
+    state: str
+    # Seconds to wait before restarting the container
+    delay: float = 0
+    # Whether this crash tripped the circuit breaker
+    tripped: bool = False
+
+
+class CrashLoopTracker:
+    """
+    Crash rate of each container of a machine over a sliding window. Restarts are delayed with an exponential backoff as crashes
+    pile up, and stopped (circuit breaker open) after max_crashes within the window. Once reset_after seconds went by,
+    a single trial restart is allowed: the breaker opens again if the container crashes within the window after it
+    """
+    CLOSED = "closed"
+    BACKOFF = "backoff"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, machine: str, config: Config):
+        self.machine = machine
+        self.max_crashes = max(config.crash_loop_max_crashes, 1)
+        self.window = config.crash_loop_window
+        self.reset_after = config.crash_loop_reset
+        self.backoff_base = config.restart_backoff_base
+        self.backoff_max = config.restart_backoff_max
+        self.crashes: dict[str, deque[float]] = {}
+        self.opened_at: dict[str, float] = {}
+        self.trials: dict[str, float] = {}
+        # The API reads the trackers from another thread
+        self.lock = Lock()
+
+    def record_crash(self, name: str) -> CrashDecision:
+        with self.lock:
+            now = time()
+            crashes = self._prune(name, now)
+            self.crashes[name] = crashes
+            state = self._state(name, now, crashes)
+
+            # Restarts are stopped: the crash isn't counted, the container stays down until the breaker is reset
+            if state == self.OPEN:
+                return CrashDecision(self.OPEN)
+
+            # The container crashed again within the window after its trial restart
+            if name in self.trials or (state != self.HALF_OPEN and len(crashes) + 1 >= self.max_crashes):
+                self.opened_at[name] = now
+                self.trials.pop(name, None)
+                crashes.append(now)
+                return CrashDecision(self.OPEN, tripped=True)
+
+            # The breaker was open long enough: this crash gets the trial restart
+            if state == self.HALF_OPEN:
+                del self.opened_at[name]
+                crashes.clear()
+                crashes.append(now)
+                self.trials[name] = now
+                return CrashDecision(self.HALF_OPEN)
+
+            delay = self._delay(len(crashes))
+            crashes.append(now)
+            return CrashDecision(self.BACKOFF if delay else self.CLOSED, delay)
+
+    def start_trial(self, name: str):
+        """
+        Lets a single restart through an open breaker. The breaker opens again if the container crashes within the window after it
+        """
+        with self.lock:
+            self.opened_at.pop(name, None)
+            self.crashes[name] = deque([time()])
+            self.trials[name] = time()
+
+    def pending_trials(self) -> dict[str, float]:
+        """
+        Seconds left before the trial restart of each open breaker, by container name. The tracker outlives the runtimes,
+        a restarted runtime schedules these trials again
+        """
+        with self.lock:
+            now = time()
+            return {name: max(self.reset_after - (now - opened_at), 0) for name, opened_at in self.opened_at.items()}
+
+    def reset(self, name: str) -> bool:
+        """
+        Closes the circuit breaker of a container and forgets its crashes
+        """
+        with self.lock:
+            known = name in self.crashes or name in self.opened_at
+            self.crashes.pop(name, None)
+            self.opened_at.pop(name, None)
+            self.trials.pop(name, None)
+            return known
+
+    def states(self) -> list[CrashLoopState]:
+        with self.lock:
+            now = time()
+            states = []
+
+            for name in sorted(set(self.crashes) | set(self.opened_at)):
+                crashes = self._prune(name, now)
+                opened_at = self.opened_at.get(name)
+                if not crashes and opened_at is None:
+                    continue
+
+                states.append(CrashLoopState(
+                    machine=self.machine,
+                    container_name=name,
+                    state=self._state(name, now, crashes),
+                    crashes=len(crashes),
+                    next_delay=self._delay(len(crashes)) if opened_at is None else 0,
+                    last_crash=datetime.fromtimestamp(crashes[-1]) if crashes else None,
+                    opened_at=datetime.fromtimestamp(opened_at) if opened_at is not None else None
+                ))
+
+            return states
+
+    def _state(self, name: str, now: float, crashes: deque[float]) -> str:
+        opened_at = self.opened_at.get(name)
+
+        if opened_at is not None:
+            return self.OPEN if now - opened_at < self.reset_after else self.HALF_OPEN
+
+        if name in self.trials:
+            return self.HALF_OPEN
+
+        return self.BACKOFF if self._delay(len(crashes)) else self.CLOSED
+
+    def _delay(self, crashes: int) -> float:
+        """
+        No delay for the first crash of the window, then backoff_base, doubling on every crash up to backoff_max
+        """
+        if crashes == 0:
+            return 0
+        return min(self.backoff_base * 2 ** (crashes - 1), self.backoff_max)
+
+    def _prune(self, name: str, now: float) -> deque[float]:
+        """
+        Drops the crashes and trials that fell out of the window. The crashes of an open breaker are kept until it is reset.
+        Containers left without crashes are forgotten
+        """
+        crashes = self.crashes.pop(name, deque())
+
+        if name not in self.opened_at:
+            while crashes and now - crashes[0] >= self.window:
+                crashes.popleft()
+
+        trial = self.trials.get(name)
+        if trial is not None and now - trial >= self.window:
+            del self.trials[name]
+
+        if crashes:
+            self.crashes[name] = crashes
+
+        return crashes
@@ -0,0 +1,99 @@
+from __future__ import annotations
+import asyncio
+import atexit
+from logging import Logger
+from queue import Empty, Full, Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import TYPE_CHECKING
+from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
+from app.backend.schemas.crashed_container_schema import CrashedContainerLogs
+
+if TYPE_CHECKING:
+    from app.backend.core import Config
+
+
+class CrashPersistenceService:
+    """
+    Single writer for the crashed containers table, shared by every runtime.
+    Crashes are queued and written in batches from a dedicated thread, so the database never sits on the restart path
+    """
+    _instance = None
+    _lock = Lock()
+    # Seconds to wait for the pending crashes to be written when the process exits
+    SHUTDOWN_TIMEOUT = 10
+    _STOP = object()
+
+    def __new__(cls, config: Config, logger: Logger):
+        with cls._lock:
+            if cls._instance is None:
+                instance = super().__new__(cls)
+                instance.logger = logger
+                instance.batch_size = max(config.crash_batch_size, 1)
+                instance.flush_interval = config.crash_flush_interval
+                instance.queue = Queue(maxsize=config.crash_queue_size)
+                instance.stopped = False
+                instance.thread = Thread(target=instance._writer, name="crash-writer", daemon=True)
+                instance.thread.start()
+                atexit.register(instance.stop)
+                cls._instance = instance
+
+            return cls._instance
+
+    async def add(self, crash: CrashedContainerLogs):
+        """
+        Queues a crash to be written. Waits, without blocking the event loop, while the queue is full
+        """
+        try:
+            self.queue.put_nowait(crash)
+        except Full:
+            self.logger.warning("Crash persistence queue is full, waiting for the writer to catch up")
+            await asyncio.to_thread(self.queue.put, crash)
+
+    def stop(self):
+        """
+        Writes the crashes still queued and stops the writer thread
+        """
+        if self.stopped:
+            return
+
+        self.stopped = True
+        self.queue.put(self._STOP)
+        self.thread.join(self.SHUTDOWN_TIMEOUT)
+
+        if self.thread.is_alive():
+            self.logger.warning(f"Crash writer did not finish in {self.SHUTDOWN_TIMEOUT}s, about {self.queue.qsize()} crash(es) were not saved")
+
+    def _writer(self):
+        batch: list[CrashedContainerLogs] = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(deadline - monotonic(), 0)
+
+            try:
+                crash = self.queue.get(timeout=timeout)
+            except Empty:
+                crash = None
+
+            if crash is self._STOP:
+                if batch:
+                    self._flush(batch)
+                return
+
+            if crash is not None:
+                batch.append(crash)
+                # The first crash of a batch starts the time trigger
+                if deadline is None:
+                    deadline = monotonic() + self.flush_interval
+
+            if batch and (crash is None or len(batch) >= self.batch_size):
+                self._flush(batch)
+                batch = []
+                deadline = None
+
+    def _flush(self, batch: list[CrashedContainerLogs]):
+        try:
+            CrashedContainerRepository.add_crashed_containers(batch, self.logger)
+        except Exception as e:
+            self.logger.error(f"Unable to save {len(batch)} crashed container(s): {e}")
@@ -1,66 +1,164 @@
 from __future__ import annotations
+import asyncio
 from logging import Logger
+from datetime import datetime
 from time import time
 from typing import TYPE_CHECKING
 from app.agent import AgentClient
-from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
-from app.backend.schemas.crashed_container_schema import CrashedContainerBase
+from app.backend.schemas.crashed_container_schema import CrashedContainerLogs
+from app.backend.services.crash_loop_tracker import CrashLoopTracker
+from app.backend.utils.ttl_map import KeyedLocks, TTLMap
 
 if TYPE_CHECKING:
     from app.backend.core import Config
     from app.backend.events import Event
+    from app.backend.models import ContainerProxy
     from app.backend.providers import ContainerProvider
-    from app.backend.services import NotificationService, RestartService
+    from app.backend.services import ContainerStateCache, CrashPersistenceService, NotificationService, RestartService
     
 
 class EventHandlerService:
     # Seconds to wait after a container is restarted
     DELAY = 30
+    # Upper bound of containers in cooldown at the same time
+    COOLDOWN_MAX_SIZE = 10000
 
     def __init__(
             self,
             client: ContainerProvider,
             config: Config,
+            state_cache: ContainerStateCache,
             restart_service: RestartService,
             notification_service: NotificationService,
+            crash_persistence: CrashPersistenceService,
+            crash_loop_tracker: CrashLoopTracker,
             logger: Logger
         ):
         self.client = client
         self.config = config
+        self.state_cache = state_cache
         self.restart_service = restart_service
         self.notification_service = notification_service
+        self.crash_persistence = crash_persistence
+        self.crash_loop_tracker = crash_loop_tracker
         self.logger = logger
-        self.cooldown = {}
+        # Containers restarted within the last DELAY seconds. Their events are the restart's own
+        self.cooldown: TTLMap[str, float] = TTLMap(ttl=self.DELAY, max_size=self.COOLDOWN_MAX_SIZE)
+        self.locks: KeyedLocks[str] = KeyedLocks()
+        # Restarts delayed by the crash loop backoff, by container name
+        self.pending_restarts: dict[str, asyncio.Task] = {}
 
     async def handle(self, event: Event):
         try:
             self.logger.debug(f"Handling event {event.type} for container {event.container_name}")
 
-            container = await self.client.get_container(event.container_id or event.container_name)
+            # The crashed container is always read from the provider: its restart policy decision must not rely on a state the daemon may already have moved past
+            container = await self.state_cache.get_container(event.container_id or event.container_name, refresh=True)
             if container is None:
                 return
             
-            last_event_time = self.cooldown.get(container.id or container.name)
+            # Workers handling events of the same container take turns, so a single crash is never restarted twice
+            async with self.locks(container.name):
+                await self._handle_crash(container)
+        except Exception as e:
+            self.logger.error(e)
 
-            if last_event_time and time() - last_event_time < self.DELAY:
-                return
-            
-            if await self.restart_service.can_be_restarted(container):
-                logs = await self.client.get_logs(container.id or container.name, self.config.logs_amount)
-                await self.restart_service.restart_with_graph(container)
+    async def _handle_crash(self, container: ContainerProxy):
+        if (container.id or container.name) in self.cooldown:
+            return
+
+        if container.name in self.pending_restarts:
+            self.logger.debug(f"A restart of {container.name} is already scheduled")
+            return
 
-                agent_name: str | None = self.client.client.name if type(self.client.client) is AgentClient else None
+        if await self.restart_service.can_be_restarted(container):
+            crashed_on = datetime.now()
+            decision = self.crash_loop_tracker.record_crash(container.name)
+            logs = await self.client.get_logs(container.id or container.name, self.config.logs_amount)
+
+            # Once the circuit breaker is open, crashes are still recorded but neither restarted nor notified
+            notify = True
+
+            if decision.state == CrashLoopTracker.OPEN and not decision.tripped:
+                self.logger.debug(f"Circuit breaker of {container.name} is open, it won't be restarted")
+                notify = False
+            elif decision.state == CrashLoopTracker.OPEN:
+                self.logger.warning(f"{container.name} is crash looping: restarts are stopped for {self.config.crash_loop_reset}s")
+                self._schedule_restart(container.name, self.config.crash_loop_reset, trial=True)
+            elif decision.delay:
+                self.logger.warning(f"{container.name} crashed again: restarting it in {decision.delay}s")
+                self._schedule_restart(container.name, decision.delay)
+            else:
+                # A failed restart is logged, the crash is still notified and recorded
+                try:
+                    await self.restart_service.restart_with_graph(container)
+                except Exception as e:
+                    self.logger.error(f"Restart of {container.name} failed: {e}")
+                self.cooldown.set(container.id or container.name, time())
+
+            agent_name: str | None = self.client.client.name if type(self.client.client) is AgentClient else None
+            if notify:
                 await self.notification_service.notify(container.name, logs, container.exit_code or '', agent_name)
-                
-                # If the agent name is not available, the event happened on the server, so we set the machine to 'Server'. Otherwise, we set it to the agent name.
-                machine = agent_name if agent_name else 'Server'
 
-                ## Add record to the CrashedContainer table
-                crashed_container = CrashedContainerBase(container_id=container.id, container_name=container.name, logs=logs, machine=machine)
-                CrashedContainerRepository.add_crashed_container(crashed_container, self.logger)
+            ## Add record to the CrashedContainer table. The machine is the agent name, or 'Server' for the local daemon
+            crashed_container = CrashedContainerLogs(container_id=container.id, container_name=container.name, logs=logs, machine=self.client.machine, crashed_on=crashed_on)
+            await self.crash_persistence.add(crashed_container)
 
-                self.cooldown[container.id or container.name] = time()
-        except Exception as e:
-            self.logger.error(e)
+    def start(self):
+        """
+        Schedules the trial restarts of the circuit breakers left open by a previous run
+        """
+        for container_name, delay in self.crash_loop_tracker.pending_trials().items():
+            if container_name not in self.pending_restarts:
+                self.logger.info(f"Circuit breaker of {container_name} is open: trying to restart it in {delay:.0f}s")
+                self._schedule_restart(container_name, delay, trial=True)
 
+    async def reset_crash_loop(self, container_name: str, restart: bool) -> tuple[bool, bool]:
+        """
+        Closes the circuit breaker of a container, cancelling the restart scheduled by the crash loop backoff, and restarts it
+        right away when asked to, if the restart policy still applies. Returns whether the container was tracked, and whether a restart was scheduled
+        """
+        task = self.pending_restarts.pop(container_name, None)
+        if task is not None:
+            task.cancel()
 
+        known = self.crash_loop_tracker.reset(container_name) or task is not None
+        if not known or not restart:
+            return known, False
+
+        self._schedule_restart(container_name, 0)
+        return True, True
+
+    def stop(self):
+        for task in self.pending_restarts.values():
+            task.cancel()
+        self.pending_restarts.clear()
+
+    def _schedule_restart(self, container_name: str, delay: float, trial: bool = False):
+        self.pending_restarts[container_name] = asyncio.create_task(self._restart_later(container_name, delay, trial))
+
+    async def _restart_later(self, container_name: str, delay: float, trial: bool):
+        """
+        Restarts a container after the crash loop delay, unless it recovered or was removed in the meantime.
+        A trial restart lets a single restart through the open circuit breaker
+        """
+        try:
+            await asyncio.sleep(delay)
+
+            container = await self.state_cache.get_container(container_name, refresh=True)
+            if container is None or not await self.restart_service.can_be_restarted(container):
+                self.logger.info(f"{container_name} doesn't need to be restarted anymore")
+                return
+
+            if trial:
+                self.logger.info(f"Trying to restart {container_name} after its crash loop")
+                self.crash_loop_tracker.start_trial(container_name)
+
+            async with self.locks(container_name):
+                await self.restart_service.restart_with_graph(container)
+                self.cooldown.set(container.id or container.name, time())
+        except Exception as e:
+            self.logger.error(f"Delayed restart of {container_name} failed: {e}")
+        finally:
+            if self.pending_restarts.get(container_name) is asyncio.current_task():
+                del self.pending_restarts[container_name]
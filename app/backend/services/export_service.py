@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterator
+from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
+
+
+class ExportService:
+    """
+    Streams the crash history as NDJSON or CSV, optionally gzipped, without holding more than a chunk of rows in memory
+    """
+    MEDIA_TYPE = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+    # Rows read from the database cursor at a time
+    CHUNK_SIZE = 1000
+    # Bytes buffered before a chunk is sent to the client
+    FLUSH_SIZE = 64 * 1024
+
+    @staticmethod
+    def export_crashed_containers(date_from:str, date_to:str, format:str, include_logs:bool = True, gzip:bool = False) -> Iterator[bytes]:
+        try:
+            date_from_dt = datetime.strptime(date_from, "%Y-%m-%d")
+            date_to_dt = datetime.strptime(date_to, "%Y-%m-%d")
+        except ValueError:
+            raise ValueError("Incorrect date format, should be YYYY-MM-DD")
+
+        if format not in ExportService.MEDIA_TYPE:
+            raise ValueError(f"Unsupported format {format}, should be one of {list(ExportService.MEDIA_TYPE)}")
+
+        rows = CrashedContainerRepository.iter_crashed_containers(date_from_dt, date_to_dt, include_logs, ExportService.CHUNK_SIZE)
+        chunks = ExportService._to_ndjson(rows) if format == "ndjson" else ExportService._to_csv(rows, include_logs)
+        chunks = ExportService._buffered(chunks)
+
+        return ExportService._gzipped(chunks) if gzip else chunks
+
+    @staticmethod
+    def _to_ndjson(rows) -> Iterator[str]:
+        for record in rows:
+            record["crashed_on"] = record["crashed_on"].isoformat()
+            yield json.dumps(record) + "\n"
+
+    @staticmethod
+    def _to_csv(rows, include_logs:bool) -> Iterator[str]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        header = ["id", "container_id", "container_name", "machine", "crashed_on"]
+        if include_logs:
+            header.append("logs")
+        writer.writerow(header)
+
+        for record in rows:
+            writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in record.values()])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        yield buffer.getvalue()
+
+    @staticmethod
+    def _buffered(chunks:Iterator[str]) -> Iterator[bytes]:
+        """
+        Groups the records into chunks of about FLUSH_SIZE bytes, instead of sending one record at a time
+        """
+        buffer: list[bytes] = []
+        size = 0
+
+        for chunk in chunks:
+            data = chunk.encode()
+            buffer.append(data)
+            size += len(data)
+
+            if size >= ExportService.FLUSH_SIZE:
+                yield b"".join(buffer)
+                buffer = []
+                size = 0
+
+        if buffer:
+            yield b"".join(buffer)
+
+    @staticmethod
+    def _gzipped(chunks:Iterator[bytes]) -> Iterator[bytes]:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+
+        yield compressor.flush()
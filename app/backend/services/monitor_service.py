@@ -6,16 +6,18 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from app.backend.core import Config
     from app.backend.providers import ContainerProvider
-    from app.backend.services import EventHandlerService
+    from app.backend.services import ContainerStateCache, EventHandlerService, RestartService
 
 
 class MonitorService():
     ALLOWED_EVENT_TYPE = {"die", "oom", "health_status: unhealthy"}
-    def __init__(self, client: ContainerProvider, config: Config, handler: EventHandlerService, logger: Logger):
+    def __init__(self, client: ContainerProvider, config: Config, handler: EventHandlerService, restart_service: RestartService, state_cache: ContainerStateCache, logger: Logger):
         self.client = client
         self.config = config
         self.logger = logger
         self.handler = handler
+        self.restart_service = restart_service
+        self.state_cache = state_cache
         self.queue = asyncio.Queue(maxsize=500)
         self.workers: list[asyncio.Task] = []
 
@@ -27,8 +29,23 @@ class MonitorService():
             for i in range(5)
         ]
 
-        async for event in self.client.stream_events():
+        try:
+            # A single listing seeds both the container state cache and the dependency graph
+            containers = await self.state_cache.load()
+            await self.restart_service.load_graph(containers)
+        except Exception as e:
+            self.logger.warning(f"Unable to load the containers, they will be loaded on demand. Error: {e}")
+
+        graph_event_type = self.restart_service.GRAPH_EVENT_TYPE
+
+        async for event in self.client.stream_events(self.ALLOWED_EVENT_TYPE | graph_event_type | self.state_cache.STATE_EVENT_TYPE):
             try:
+                self.state_cache.apply_event(event)
+
+                if event.type in graph_event_type:
+                    self.restart_service.apply_event(event)
+                    continue
+
                 if not any(event.type.startswith(x) for x in self.ALLOWED_EVENT_TYPE):
                     self.logger.debug(f"Skipping event {event.type} for container {event.container_name}")
                     continue
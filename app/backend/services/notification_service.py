@@ -1,41 +1,203 @@
 from __future__ import annotations
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
 from logging import Logger
 import re
 from typing import TYPE_CHECKING
-from app.backend.notifications import AppriseClient
+from app.backend.notifications import LazyContext, NotificationDispatcher, NotificationTemplate
 
 if TYPE_CHECKING:
     from app.backend.core import Config
+    from app.backend.models import DependencyGraph
+
+
+@dataclass
+class CrashSummary:
+    container_name: str
+    exit_code: str
+    last_log: str
+    first_crash: datetime
+    last_crash: datetime
+    crashes: int = 1
+
+
+@dataclass
+class Incident:
+    """
+    Crashes of a single dependency subgraph of a machine, collected until the digest window closes
+    """
+    agent_name: str | None
+    roots: set[str]
+    opened_at: datetime
+    summaries: dict[str, CrashSummary] = field(default_factory=dict)
+    # Logs of the first crash, sent as a regular notification if nothing else crashes within the window
+    logs: str = ''
+    flush_task: asyncio.Task | None = None
 
 
 class NotificationService:
     ANSI_ESCAPE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
-    
-    def __init__(self, config: Config, logger: Logger):
+    DEFAULT_TITLE = '⚠️ {container_name} crashed'
+    DEFAULT_AGENT_TITLE = '⚠️ Agent: {agent_name} | {container_name} crashed'
+    DEFAULT_BODY = '`exit code`: `{exit_code}`\nLast {n_logs} logs of `{container_name}`: {logs}'
+    # Characters of the last log line kept in a digest summary
+    DIGEST_LOG_LINE_LENGTH = 200
+
+    def __init__(self, config: Config, logger: Logger, graph: DependencyGraph | None = None):
         self.config = config
         self.logger = logger
-        self.client = AppriseClient(self.config.notification_urls)
-    
+        self.graph = graph
+        self.dispatcher = NotificationDispatcher(self.config, self.logger)
+        self.incidents: list[Incident] = []
+        self.title_template, self.body_template = self._compile_templates()
+
     async def notify(self, container_name:str, container_logs:str, container_exit_code:str, agent_name:str | None = None):
-        
-        self.logger.info("Sending notifications")
-        
+        """
+        Sends a crash notification. With a digest window set, the crash joins the open incident of its dependency subgraph instead,
+        and a single digest is sent for the whole incident once the window closes
+        """
+        if self.config.notification_digest_window <= 0:
+            self._send_crash(container_name, container_logs, container_exit_code, agent_name)
+            return
+
+        try:
+            self._add_to_incident(container_name, container_logs, container_exit_code, agent_name)
+        except Exception as e:
+            self.logger.error(f"An error occured while grouping a notification. Error: {e}")
+
+    def stop(self):
+        """
+        Sends the digests of the incidents still open
+        """
+        for incident in list(self.incidents):
+            self._flush(incident)
+
+    def _add_to_incident(self, container_name: str, container_logs: str, container_exit_code: str, agent_name: str | None):
+        now = datetime.now()
+        roots = self.graph.roots_of(container_name) if self.graph is not None else {container_name}
+        incident = next((i for i in self.incidents if i.agent_name == agent_name and i.roots & roots), None)
+
+        if incident is None:
+            incident = Incident(agent_name=agent_name, roots=set(roots), opened_at=now, logs=container_logs)
+            incident.flush_task = asyncio.create_task(self._flush_later(incident))
+            self.incidents.append(incident)
+            self.logger.debug(f"Notifications of {sorted(roots)} are grouped for {self.config.notification_digest_window}s")
+        else:
+            incident.roots |= roots
+
+        summary = incident.summaries.get(container_name)
+        last_log = self._last_log_line(container_logs)
+
+        if summary is None:
+            incident.summaries[container_name] = CrashSummary(container_name, str(container_exit_code), last_log, now, now)
+        else:
+            summary.exit_code = str(container_exit_code)
+            summary.last_log = last_log
+            summary.last_crash = now
+            summary.crashes += 1
+
+        if len(incident.summaries) >= self.config.notification_digest_max_size:
+            self._flush(incident)
+
+    async def _flush_later(self, incident: Incident):
+        await asyncio.sleep(self.config.notification_digest_window)
+        incident.flush_task = None
+        self._flush(incident)
+
+    def _flush(self, incident: Incident):
+        if incident not in self.incidents:
+            return
+
+        self.incidents.remove(incident)
+        if incident.flush_task is not None:
+            incident.flush_task.cancel()
+
+        summaries = list(incident.summaries.values())
+
+        if len(summaries) == 1 and summaries[0].crashes == 1:
+            summary = summaries[0]
+            self._send_crash(summary.container_name, incident.logs, summary.exit_code, incident.agent_name)
+        else:
+            self._send_digest(incident, summaries)
+
+    def _send_crash(self, container_name: str, container_logs: str, container_exit_code: str, agent_name: str | None):
+        self.logger.info("Queuing notifications")
+
         try:
-            context = {
+            # Logs are only cleaned when a template renders them
+            context = LazyContext({
                 "container_name": container_name,
-                "logs": self.ANSI_ESCAPE.sub('',container_logs),
+                "logs": lambda: self.ANSI_ESCAPE.sub('',container_logs),
                 "exit_code": container_exit_code,
                 "n_logs": self.config.logs_amount,
                 "agent_name": agent_name
-            }
-            
-            notification_title:str = '⚠️ ' + ('Agent: {agent_name} | ' if agent_name is not None else '') + '{container_name} crashed'
-
-            title = (self.config.notification_title or notification_title).format(**context)
-            body = (self.config.notification_body or '`exit code`: `{exit_code}`\nLast {n_logs} logs of `{container_name}`: {logs}').format(**context)
-            self.client.send(body=body, title=title)
-        
-            self.logger.info("Notification sent")
-              
+            })
+
+            title_template = self.title_template or NotificationTemplate.compile(self.DEFAULT_AGENT_TITLE if agent_name is not None else self.DEFAULT_TITLE)
+            body_template = self.body_template
+            title_values = title_template.values(context)
+            body_values = body_template.values(context)
+
+            # Sent by the dispatcher workers, the runtime loop doesn't wait for the notification services
+            if title_template.per_channel or body_template.per_channel:
+                self.dispatcher.send_rendered(lambda channel: (title_template.render(title_values, channel), body_template.render(body_values, channel)))
+            else:
+                self.dispatcher.send(title=title_template.render(title_values), body=body_template.render(body_values))
+
+        except Exception as e:
+            self.logger.error(f"An error occured while sending a notification. Error: {e}")
+
+    def _send_digest(self, incident: Incident, summaries: list[CrashSummary]):
+        self.logger.info(f"Queuing a digest of {len(summaries)} crashed container(s)")
+
+        try:
+            crashes = sum(summary.crashes for summary in summaries)
+            title = '⚠️ ' + (f'Agent: {incident.agent_name} | ' if incident.agent_name is not None else '') + f'{len(summaries)} container(s) crashed {crashes} time(s)'
+
+            lines = [f"Crashes between {incident.opened_at:%H:%M:%S} and {max(s.last_crash for s in summaries):%H:%M:%S}:"]
+            for summary in summaries:
+                line = f"- `{summary.container_name}`: exit code `{summary.exit_code}`"
+                if summary.crashes > 1:
+                    line += f", {summary.crashes} crashes"
+                if summary.last_log:
+                    line += f", last log: `{summary.last_log}`"
+                lines.append(line)
+
+            lines.append(f"Full logs: {self.config.dashboard_url}" if self.config.dashboard_url else "Full logs are available in the dashboard")
+            self.dispatcher.send(title=title, body='\n'.join(lines))
+
         except Exception as e:
-            self.logger.error(f"An error occured while sending a notification. Error: {e}")
\ No newline at end of file
+            self.logger.error(f"An error occured while sending a notification digest. Error: {e}")
+
+    def _last_log_line(self, logs: str) -> str:
+        lines = [line.strip() for line in self.ANSI_ESCAPE.sub('', logs or '').splitlines() if line.strip()]
+        if not lines:
+            return ''
+
+        line = lines[-1].replace('`', "'")
+        if len(line) > self.DIGEST_LOG_LINE_LENGTH:
+            line = line[:self.DIGEST_LOG_LINE_LENGTH - 1] + '…'
+        return line
+
+    def _compile_templates(self) -> tuple[NotificationTemplate | None, NotificationTemplate]:
+        """
+        Compiles the configured title and body once. Invalid templates fall back to the default ones
+        """
+        engine = self.config.notification_template_engine
+        title_template = None
+        body_template = NotificationTemplate.compile(self.DEFAULT_BODY)
+
+        try:
+            if self.config.notification_title:
+                title_template = NotificationTemplate.compile(self.config.notification_title, engine)
+        except Exception as e:
+            self.logger.error(f"Invalid notification title template, using the default one. Error: {e}")
+
+        try:
+            if self.config.notification_body:
+                body_template = NotificationTemplate.compile(self.config.notification_body, engine)
+        except Exception as e:
+            self.logger.error(f"Invalid notification body template, using the default one. Error: {e}")
+
+        return title_template, body_template
@@ -1,26 +1,36 @@
 from __future__ import annotations
 import asyncio
-from datetime import datetime
-from time import time
 from logging import Logger
 from typing import List, TYPE_CHECKING
+from app.backend.models import DependencyGraph
+from app.backend.providers.container_provider import RestartPlanUnsupported
+from app.backend.schemas.restart_plan_schema import RestartPlan
+from app.backend.utils.ttl_map import TTLMap
 
 if TYPE_CHECKING:
+    from app.backend.events import Event
     from app.backend.models import ContainerProxy
     from app.backend.providers import ContainerProvider
+    from app.backend.services import ContainerStateCache
 
 class RestartService:
-    DOCKER_SURGEON_LABEL = "com.monitor.depends.on"
-    CACHE_GRAPH_TIME_AMOUNT = 600
+    DOCKER_SURGEON_LABEL = DependencyGraph.DEPENDS_ON_LABEL
+    # Container events that change the dependency graph
+    GRAPH_EVENT_TYPE = {"create", "destroy", "rename"}
+    # Seconds to wait for a parent to be either 'running' or 'healthy' before skipping its children
+    PARENT_READY_TIMEOUT = 60
+    # Seconds after which a container reserved by a restart is released, should the restart never release it
+    IN_PROGRESS_TTL = 900
     
-    def __init__(self, restart_policy: dict, client: ContainerProvider, logger: Logger):
+    def __init__(self, restart_policy: dict, client: ContainerProvider, state_cache: ContainerStateCache, logger: Logger, max_concurrency: int = 4):
         self.restart_policy = restart_policy
         self.logger = logger
         self.client = client
-        self.in_progress = set()
-        self.graph = {}
-        self.last_graph_load_time = 0
-        self.lock = asyncio.Lock()
+        self.state_cache = state_cache
+        self.max_concurrency = max_concurrency
+        # Containers being restarted, each mapped to the restart that reserved it
+        self.in_progress: TTLMap[str, object] = TTLMap(ttl=self.IN_PROGRESS_TTL)
+        self.graph = DependencyGraph(self.DOCKER_SURGEON_LABEL)
 
     async def can_be_restarted(
         self,
@@ -62,37 +72,40 @@ class RestartService:
         
         return False
     
-    def _build_dependency_graph(self, containers: List[ContainerProxy]) -> dict:
-        graph = {}
-        for container in containers:
-            depends_on = container.labels.get(self.DOCKER_SURGEON_LABEL)
-            name = container.name
-
-            if depends_on:
-                parents = [p.strip() for p in depends_on.split(",")]
-                for parent in parents:
-                    if parent not in graph:
-                        graph[parent] = []
-                    graph[parent].append(name)
-        return graph
-    
-    def _topological_sort(self, graph: dict) -> list:
-        already_visited = set()
-        stack = []
-
-        def visit(node):
-            if node in already_visited:
-                return
-            already_visited.add(node)
-            for child in graph.get(node, []):
-                visit(child)
-            stack.append(node)
-
-        for node in graph:
-            visit(node)
-
-        return stack[::-1]  # Invert the results
-    
+    async def load_graph(self, containers: List[ContainerProxy] | None = None):
+        """
+        Seeds the dependency graph from the current containers. From then on it is kept up to date by apply_event
+        """
+        if containers is None:
+            containers = await self.client.list_containers()
+        self.graph.load(containers)
+        self.logger.debug(f"Dependency graph loaded: {self.graph}")
+
+        if self.graph.cyclic_nodes:
+            self.logger.warning(f"Dependency cycle detected between {sorted(self.graph.cyclic_nodes)}")
+
+    def apply_event(self, event: Event):
+        """
+        Updates the dependency graph from a create/destroy/rename container event
+        """
+        if not self.graph.loaded or not event.container_name:
+            return
+
+        if event.type == "create":
+            self.graph.add_container(event.container_name, event.attributes)
+        elif event.type == "destroy":
+            self.graph.remove_container(event.container_name)
+        elif event.type == "rename":
+            old_name = event.attributes.get("oldName", "").lstrip("/")
+            self.graph.rename_container(old_name, event.container_name, event.attributes)
+        else:
+            return
+
+        self.logger.debug(f"Dependency graph updated after {event.type} of {event.container_name}")
+
+        if event.container_name in self.graph.cyclic_nodes:
+            self.logger.warning(f"Dependency cycle detected between {sorted(self.graph.cyclic_nodes)}")
+
     async def restart_with_graph(
         self,
         unhealthy_container: ContainerProxy | None
@@ -101,27 +114,26 @@ class RestartService:
         if unhealthy_container is None:
             return
         
-        containers = await self.client.list_containers()
-
-        if self.graph == {} or ((time() - self.last_graph_load_time) > self.CACHE_GRAPH_TIME_AMOUNT):
-            self.graph = self._build_dependency_graph(containers)
-            self.last_graph_load_time = time()
+        if not self.graph.loaded:
+            await self.load_graph()
 
-        sorted_container_names = self._topological_sort(self.graph)
-        
         self.logger.debug(f"Graph: {self.graph}")
-        self.logger.debug(f"Sorted container names: {sorted_container_names}")
         
         to_restart = [unhealthy_container.name]
         relevant = set(to_restart)
+        descendants = self.graph.descendants(unhealthy_container.name)
+
+        for container_name in self.graph.topological_order():
+            if container_name not in descendants:
+                continue
 
-        for container_name in sorted_container_names:
             # Check if the current container's parent(s) are in the list of containers to be restarted
-            parents = [parent for parent, children in self.graph.items() if container_name in children]
+            if not self.graph.parents_of(container_name) & relevant:
+                continue
             
             # Check if the container actually exists before trying to get it
             try:
-                ct = await self.client.get_container(container_name)
+                ct = await self.state_cache.get_container(container_name)
             except Exception:
                 self.logger.debug(f"Dependent container {container_name} not found, skipping.")
                 continue
@@ -129,160 +141,153 @@ class RestartService:
             if ct is None:
                 continue
             
-            if any(parent in relevant for parent in parents) and await self.can_be_restarted(ct, check_on_children=True):
+            if await self.can_be_restarted(ct, check_on_children=True):
                 to_restart.append(container_name)
                 relevant.add(container_name)
 
         self.logger.debug(f"Containers to restart: {to_restart}")
-        
-        parents = set(self.graph.keys())
-        restarted_parents = set()
-        pending_children = set()
-        
-        for container_name in to_restart:
-            async with self.lock:
-                if container_name in self.in_progress:
-                    continue
-                self.in_progress.add(container_name)
-            try:
-                container = await self.client.get_container(container_name)
-                if container is None:
-                    self.logger.warning(f"Container {container_name} not found. Skipping restart")
-                    continue
-
-                self.logger.info(f"Restarting container {container.name} ({container.id[:12]})")
-                
-                if container.name in parents:
-                    timeout = 60
-                    await self.client.restart_container(container_name)
-                    self.logger.debug(f"Dependent containers found for {container.name}. Waiting until it is either 'running' or 'healthy'")
-                    self.logger.debug(f"Waiting {timeout} seconds before aborting the restart operation")
-                    operationInitTime = datetime.now()
-                    while True:
-                        if await self._parentSuccessfullyRestarted(container):
-                            self.logger.debug(f"{container.name} restarted successfully. Proceeding to restart his children")
-                            restarted_parents.add(container.name)
-                            break
-                        if self._operationTimedOut(operationInitTime, datetime.now(), timeout):
-                            self.logger.warning(f"{container.name} did not recover in time - skipping dependent containers")
-                            break
-                        await asyncio.sleep(2)
-                else:
-                    parents_of_child = [p for p, children in self.graph.items() if container.name in children]
-                    
-                    if not parents_of_child:
-                        self.logger.info(f"Container {container.name} has no parent dependencies - restarting independently.")
-                        await self.client.restart_container(container.id or container.name)            
-                    else:
-                        parents_of_child.sort(key=lambda p: len(self.graph.get(p, [])), reverse=True)
-                        unready_parents = [p for p in parents_of_child if p in to_restart and p not in restarted_parents]
-                        
-                        if unready_parents:
-                            self.logger.warning(f"Skipping {container.name}: waiting for parent(s) {unready_parents}.")
-                            pending_children.add(container.name)
-                            continue
-                            
-                        self.logger.info(f"Restarting child {container.name} ({container.id[:12]}) - parent(s) ready")
-                        await self.client.restart_container(container.id or container.name)
 
-                self.logger.info(f"Successfully restarted {container.name}")
-            except Exception as e:
-                self.logger.error(f"Failed to restart {container_name}: {e}")
-            finally:
-                async with self.lock:
-                    self.in_progress.discard(container_name)
-        
-        if pending_children:
-            await self._retry_pending_children(pending_children, restarted_parents)
-        
+        # Checked and reserved without awaiting in between, so concurrent restarts can't reserve the same container
+        token = object()
+        names = [name for name in to_restart if name not in self.in_progress]
+        for name in names:
+            self.in_progress.set(name, token)
 
-        self.in_progress.clear()
+        try:
+            plan = self._build_restart_plan(names)
+            self.logger.debug(f"Restart plan: {plan.tiers}")
 
-    async def _parentSuccessfullyRestarted(
-        self,
-        container: ContainerProxy | None
-    ) -> bool:
+            if self.client.supports_restart_plan:
+                handled: set[str] = set()
+                try:
+                    await self._run_remote_plan(plan, handled)
+                    return
+                except RestartPlanUnsupported as e:
+                    self.logger.info(f"{e}. Restarting containers locally")
+                except Exception as e:
+                    # Unreachable agent, server error or broken progress line: the containers the agent didn't report are restarted one by one
+                    self.logger.error(f"Remote restart plan failed: {e}. Restarting the remaining containers locally")
+                    plan = self._build_restart_plan([name for name in names if name not in handled])
+
+            await self._run_local_plan(plan)
+        finally:
+            # Only releases the containers this restart reserved
+            for name in names:
+                if self.in_progress.get(name) is token:
+                    self.in_progress.pop(name)
+
+    def _build_restart_plan(self, to_restart: List[str]) -> RestartPlan:
         """
-        Checks if the parent container has successfully restarted
+        Splits the containers to restart into dependency levels (Kahn layers): a level only holds containers whose parents are all in previous levels
         """
-        if container is None:
-            self.logger.warning("Unable to check whether the container has been successfully restarted")
-            return False
-        
-        self.logger.debug(f"Reloading container object with id {container.id or container.name}")
-        container = await self.client.get_container(container.id or container.name)
+        relevant = set(to_restart)
+        parents = {
+            name: [p for p in self.graph.parents_of(name) if p in relevant and p != name]
+            for name in to_restart
+        }
+        children: dict[str, List[str]] = {name: [] for name in to_restart}
+        for name, name_parents in parents.items():
+            for parent in name_parents:
+                children[parent].append(name)
 
-        if container is None:
-            self.logger.warning("Unable to check whether the container has been successfully restarted")
-            return False
+        in_degree = {name: len(name_parents) for name, name_parents in parents.items()}
+        level = [name for name in to_restart if in_degree[name] == 0]
+        tiers: List[List[str]] = []
 
-        # A container Health status is unknown when there's not healthcheck for it
-        if (container.health_status in ["healthy", "unknown"]) and container.status == "running":
-            return True
-        
-        return False
+        while level:
+            tiers.append(level)
+            next_level = []
+            for name in level:
+                for child in children[name]:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        next_level.append(child)
+            level = next_level
 
-    def _operationTimedOut(
-        self,
-        initialDate: datetime, 
-        endDate:datetime, 
-        timeout:int
-    ) -> bool:
+        placed = {name for tier in tiers for name in tier}
+        cyclic = [name for name in to_restart if name not in placed]
+        if cyclic:
+            self.logger.warning(f"Dependency cycle detected between {cyclic}. They will be restarted last, without waiting on each other")
+            tiers.append(cyclic)
+
+        return RestartPlan(
+            tiers=tiers,
+            parents={name: [p for p in name_parents if p in placed] for name, name_parents in parents.items() if name_parents},
+            wait_ready=[name for name in to_restart if children[name]],
+            ready_timeout=self.PARENT_READY_TIMEOUT,
+            max_parallel=self.max_concurrency
+        )
+
+    async def _run_remote_plan(self, plan: RestartPlan, handled: set[str]):
         """
-        Checks if the operation time has exceeded the given timeout
+        Sends the whole restart to the provider as a single plan and logs the progress it streams back.
+        The containers the provider reported on are added to handled
         """
-        
-        deltaSeconds = (endDate-initialDate).seconds
-        if deltaSeconds >= timeout:
-            self.logger.debug(f"Aborting operation due to timeout exceed. Time passed: {deltaSeconds}. Max allowed: {timeout}")
-            return True
-        
-        return False
-    
-    async def _retry_pending_children(
-        self,
-        pending_children: set | list,
-        restarted_parents: set, 
-        max_retries: int = 1, 
-        delay: int = 10,
-    ):
+        for name in (name for tier in plan.tiers for name in tier):
+            self.state_cache.invalidate(name)
+
+        async for progress in self.client.run_restart_plan(plan):
+            if progress.status != "restarting":
+                handled.add(progress.container)
+
+            if progress.status == "restarting":
+                self.logger.info(f"Restarting container {progress.container}")
+            elif progress.status in ("restarted", "ready"):
+                self.logger.info(f"Successfully restarted {progress.container}")
+            elif progress.status == "not_ready":
+                self.logger.warning(f"{progress.container} did not recover in time - skipping dependent containers")
+            elif progress.status == "skipped":
+                self.logger.warning(f"Skipping {progress.container}: {progress.detail}")
+            else:
+                self.logger.error(f"Failed to restart {progress.container}: {progress.detail}")
+
+    async def _run_local_plan(self, plan: RestartPlan):
         """
-        Tries to restart pending children
+        Restarts every container of the plan concurrently, up to max_concurrency at a time.
+        Each container starts as soon as all of its own parents are ready, without waiting for the rest of its level
         """
-        self.logger.info(f"Retrying {len(pending_children)} skipped child container(s).")
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        wait_ready = set(plan.wait_ready)
+        ready: dict[str, asyncio.Future] = {name: loop.create_future() for tier in plan.tiers for name in tier}
 
-        for attempt in range(1, max_retries + 1):
-            if not pending_children:
-                break
-
-            self.logger.debug(f"Retry attempt {attempt}/{max_retries}")
-            still_pending = []
+        async def restart(container_name: str):
+            is_ready = False
+            try:
+                parents = plan.parents.get(container_name, [])
+                unready_parents = [p for p in parents if not await ready[p]]
 
-            for child_name in pending_children:
-                try:
-                    parents_of_child = [p for p, children in self.graph.items() if child_name in children]
-                    unready_parents = [p for p in parents_of_child if p not in restarted_parents]
+                if unready_parents:
+                    self.logger.warning(f"Skipping {container_name}: parent(s) {unready_parents} did not recover")
+                    return
 
-                    if unready_parents:
-                        self.logger.debug(f"{child_name} still waiting for parent(s): {unready_parents}")
-                        still_pending.append(child_name)
-                        continue
+                async with semaphore:
+                    container = await self.state_cache.get_container(container_name)
+                    if container is None:
+                        self.logger.warning(f"Container {container_name} not found. Skipping restart")
+                        return
 
-                    container = await self.client.get_container(child_name)
-                    self.logger.info(f"Retrying restart for {child_name} — parent(s) ready.")
-                    await self.client.restart_container(child_name)
-                    self.logger.info(f"Successfully restarted {child_name}")
+                    if parents:
+                        self.logger.info(f"Restarting child {container.name} ({container.id[:12]}) - parent(s) ready")
+                    else:
+                        self.logger.info(f"Restarting container {container.name} ({container.id[:12]})")
+                    # The cached state describes the container before the restart, so readiness must not trust it
+                    self.state_cache.invalidate(container.id or container.name)
+                    await self.client.restart_container(container.id or container.name)
 
-                except Exception as e:
-                    self.logger.error(f"Retry failed for {child_name}: {e}")
-                    still_pending.append(child_name)
+                if container_name in wait_ready:
+                    self.logger.debug(f"Dependent containers found for {container.name}. Waiting until it is either 'running' or 'healthy'")
+                    is_ready = await self.state_cache.wait_until_ready(container.name, plan.ready_timeout)
+                    if not is_ready:
+                        self.logger.warning(f"{container.name} did not recover in time - skipping dependent containers")
+                        return
+                else:
+                    is_ready = True
 
-            pending_children = still_pending
-            if pending_children and attempt < max_retries:
-                self.logger.debug(f"{len(pending_children)} child container(s) still pending. Waiting {delay}s before next retry.")
-                await asyncio.sleep(delay)
-            else:
-                self.logger.info("All pending child containers have been restarted successfully.")
+                self.logger.info(f"Successfully restarted {container.name}")
+            except Exception as e:
+                self.logger.error(f"Failed to restart {container_name}: {e}")
+            finally:
+                ready[container_name].set_result(is_ready)
 
-        if pending_children:
-            self.logger.warning(f"Some child containers could not be restarted after {max_retries} retries: {pending_children}")
\ No newline at end of file
+        await asyncio.gather(*(restart(name) for tier in plan.tiers for name in tier))
@@ -0,0 +1,91 @@
+from __future__ import annotations
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from logging import Logger
+from threading import Event as ThreadEvent, Thread
+from time import monotonic
+from typing import TYPE_CHECKING
+from app.backend.core.database import database_size, incremental_vacuum
+from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
+
+if TYPE_CHECKING:
+    from app.backend.core import Config
+
+
+@dataclass
+class RetentionReport:
+    logs_cleared: int = 0
+    rows_deleted: int = 0
+    snapshots_deleted: int = 0
+    # Space freed inside the database, and the part of it given back to the file system
+    bytes_reclaimed: int | None = None
+    bytes_released: int | None = None
+    duration: float = 0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+class RetentionService:
+    """
+    Background job applying the retention policy to the crash history. For each machine, the logs of the crashes older than
+    'logsDays' are dropped, and the crashes older than 'rowsDays' are deleted. Daily crash stats are always kept
+    """
+
+    def __init__(self, config: Config, logger: Logger):
+        self.logger = logger
+        self.policy = config.retention_policy
+        self.interval = config.retention_interval
+        self.batch_size = max(config.retention_batch_size, 1)
+        self.stop_event = ThreadEvent()
+        self.last_report: RetentionReport | None = None
+
+    def start(self):
+        if not self.policy:
+            self.logger.debug("No retention policy set. Crash history is kept forever")
+            return
+
+        Thread(target=self._loop, name="retention", daemon=True).start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def run(self) -> RetentionReport:
+        started_at = monotonic()
+        size_before = database_size()
+        report = RetentionReport()
+        now = datetime.now()
+
+        machines: dict[str, dict] = self.policy.get("machines", {})
+        rules = [(None, self.policy.get("default", {}))] + list(machines.items())
+
+        for machine, rule in rules:
+            machine_filter = CrashedContainerRepository.machine_filter(machine, list(machines))
+
+            if rule.get("logsDays") is not None:
+                report.logs_cleared += CrashedContainerRepository.clear_logs_before(now - timedelta(days=rule["logsDays"]), machine_filter, self.batch_size)
+
+            if rule.get("rowsDays") is not None:
+                report.rows_deleted += CrashedContainerRepository.delete_before(now - timedelta(days=rule["rowsDays"]), machine_filter, self.batch_size)
+
+        report.snapshots_deleted = CrashedContainerRepository.delete_orphan_logs(self.batch_size)
+
+        if size_before is not None:
+            report.bytes_reclaimed = size_before - database_size()
+            report.bytes_released = incremental_vacuum()
+
+        report.duration = round(monotonic() - started_at, 3)
+        self.last_report = report
+        self.logger.info(f"Retention job done: {report.as_dict()}")
+        return report
+
+    def _loop(self):
+        self.logger.info(f"Retention job scheduled every {self.interval}s with policy {self.policy}")
+
+        while not self.stop_event.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                self.logger.error(f"Retention job failed: {e}")
+
+            self.stop_event.wait(self.interval)
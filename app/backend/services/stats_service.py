@@ -1,19 +1,36 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from datetime import datetime
 from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
+from app.backend.schemas.crashed_container_schema import CrashedContainerItem, CrashedContainerPage
 
 class StatsService:
      
+    # Maximum number of crashes returned by a single page
+    MAX_PAGE_SIZE = 500
+
     @staticmethod   
-    def get_crashed_containers(date_from:str, date_to:str):
-        
+    def get_crashed_containers(date_from:str, date_to:str, limit:int, cursor:str | None = None, include_logs:bool = True, order:str = "asc") -> CrashedContainerPage:
+        """
+        A page of crashes, oldest first or, with order 'desc', most recent first. The cursor must come from a page of the same order
+        """
         try:
             date_from_dt = datetime.strptime(date_from, "%Y-%m-%d")
             date_to_dt = datetime.strptime(date_to, "%Y-%m-%d")
         except ValueError:
             raise ValueError("Incorrect date format, should be YYYY-MM-DD")
 
-        crashed_containers = CrashedContainerRepository.get_all_crashed_containers(date_from_dt, date_to_dt)
-        return crashed_containers
+        limit = max(1, min(limit, StatsService.MAX_PAGE_SIZE))
+        after = StatsService._decode_cursor(cursor) if cursor else None
+
+        # One extra row tells whether there is a next page
+        items = CrashedContainerRepository.get_crashed_containers_page(date_from_dt, date_to_dt, limit + 1, after, include_logs, descending=order == "desc")
+        next_cursor = StatsService._encode_cursor(items[limit - 1]) if len(items) > limit else None
+
+        return CrashedContainerPage(items=items[:limit], next_cursor=next_cursor)
+
+    @staticmethod
+    def get_crashed_container_logs(crash_id:int) -> CrashedContainerItem | None:
+        return CrashedContainerRepository.get_crashed_container(crash_id)
     
     @staticmethod
     def get_crashed_containers_chart_stats(date_from:str, date_to:str):
@@ -26,4 +43,15 @@ class StatsService:
 
         graph_stats = CrashedContainerRepository.get_crashed_containers_stats_by_date(date_from_dt, date_to_dt)
         return graph_stats
-        
\ No newline at end of file
+
+    @staticmethod
+    def _encode_cursor(item:CrashedContainerItem) -> str:
+        return urlsafe_b64encode(f"{item.crashed_on.isoformat()}|{item.id}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor:str) -> tuple[datetime, int]:
+        try:
+            crashed_on, crash_id = urlsafe_b64decode(cursor.encode()).decode().split("|")
+            return datetime.fromisoformat(crashed_on), int(crash_id)
+        except ValueError:
+            raise ValueError("Invalid cursor")
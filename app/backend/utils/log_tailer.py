@@ -0,0 +1,222 @@
+from __future__ import annotations
+from collections import deque
+from logging import Logger
+from threading import Event as ThreadEvent, Lock, Thread
+from typing import TYPE_CHECKING
+import docker
+
+if TYPE_CHECKING:
+    from docker import DockerClient
+    from app.backend.core import Config
+
+
+class LogBuffer:
+    """
+    Ring buffer of the most recent log lines of a container, bounded both in lines and in bytes
+    """
+
+    def __init__(self, max_lines: int, max_bytes: int):
+        self.max_lines = max(max_lines, 1)
+        self.max_bytes = max(max_bytes, 1)
+        self.lines: deque[bytes] = deque()
+        self.size = 0
+        # Start of a line whose end hasn't been read yet
+        self.partial = b''
+        # Whether lines were dropped to stay within the caps, the buffer then doesn't hold the whole log
+        self.truncated = False
+        self.lock = Lock()
+
+    def feed(self, chunk: bytes):
+        with self.lock:
+            *lines, self.partial = (self.partial + chunk).split(b'\n')
+
+            for line in lines:
+                self._append(line + b'\n')
+
+            # A line without end can't grow past the cap either
+            if len(self.partial) > self.max_bytes:
+                self.partial = self.partial[-self.max_bytes:]
+                self.truncated = True
+
+    def line_count(self) -> int:
+        with self.lock:
+            return len(self.lines) + (1 if self.partial else 0)
+
+    def tail(self, lines: int) -> bytes:
+        with self.lock:
+            if lines <= 0:
+                return b''
+
+            recent = list(self.lines)
+            if self.partial:
+                recent.append(self.partial)
+
+            return b''.join(recent[-lines:])
+
+    def _append(self, line: bytes):
+        if len(line) > self.max_bytes:
+            line = line[-self.max_bytes:]
+            self.truncated = True
+
+        self.lines.append(line)
+        self.size += len(line)
+
+        while len(self.lines) > self.max_lines or self.size > self.max_bytes:
+            self.size -= len(self.lines.popleft())
+            self.truncated = True
+
+
+class LogFollower:
+    """
+    Streams the logs of a running container into its buffer, on a dedicated thread. The stream ends when the container stops
+    """
+
+    def __init__(self, client: DockerClient, id: str, buffer: LogBuffer, logger: Logger):
+        self.client = client
+        self.id = id
+        self.buffer = buffer
+        self.logger = logger
+        self.stream = None
+        self.closed = ThreadEvent()
+        self.thread = Thread(target=self._follow, name=f"log-tail-{id[:12]}", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def close(self):
+        # Closing the stream shuts the underlying HTTP response down, which unblocks the reader thread
+        stream = self.stream
+        if stream is not None:
+            stream.close()
+        self.closed.set()
+
+    def _follow(self):
+        try:
+            container = self.client.containers.get(self.id)
+            # Read from the end of the log file, so lines written before a restart aren't read twice
+            self.stream = container.logs(stream=True, follow=True, tail=self.buffer.max_lines)
+
+            for chunk in self.stream:
+                self.buffer.feed(chunk)
+        except Exception as e:
+            if not self.closed.is_set():
+                self.logger.debug(f"Log tail of {self.id[:12]} ended: {e}")
+        finally:
+            self.closed.set()
+
+
+class LogTailer:
+    """
+    Keeps the recent logs of every running container in memory, so a crash snapshot is read instantly instead of asking the
+    daemon for the tail of a possibly huge log once the container died. Containers are followed from their start event,
+    their buffer is kept once they stop and dropped when they are destroyed. The tailer owns its docker client: every
+    follower holds one of its connections for as long as the container runs
+    """
+    # Seconds a snapshot waits for the log stream of a container that just stopped to be fully read
+    SETTLE_TIMEOUT = 0.5
+    # Connections kept by the docker client of the tailer. Past it, the connection of an ended stream is dropped instead of reused
+    MAX_POOL_SIZE = 128
+
+    def __init__(self, client: DockerClient, max_lines: int, max_bytes: int, logger: Logger):
+        self.client = client
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.logger = logger
+        self.buffers: dict[str, LogBuffer] = {}
+        self.followers: dict[str, LogFollower] = {}
+        self.lock = Lock()
+        self.events = None
+        self.stopped = ThreadEvent()
+
+    @classmethod
+    def from_config(cls, config: Config, logger: Logger) -> LogTailer:
+        """
+        A tailer with its own docker client, so its long-lived log streams never take the connections of the other docker calls
+        """
+        client = docker.from_env(max_pool_size=cls.MAX_POOL_SIZE)
+        return cls(client, config.log_tail_max_lines, config.log_tail_max_bytes, logger)
+
+    def start(self):
+        Thread(target=self._watch, name="log-tailer", daemon=True).start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.events is not None:
+            self.events.close()
+
+        with self.lock:
+            for follower in self.followers.values():
+                follower.close()
+            self.followers.clear()
+
+        self.client.close()
+
+    def follow(self, id: str):
+        """
+        Follows the current run of a container. The follower of a previous run is closed, even if its stream hasn't ended yet
+        """
+        with self.lock:
+            previous = self.followers.get(id)
+            # A fresh buffer, so the previous follower can't feed lines of the old run into it while it winds down
+            buffer = self.buffers[id] = LogBuffer(self.max_lines, self.max_bytes)
+            follower = self.followers[id] = LogFollower(self.client, id, buffer, self.logger)
+
+        if previous is not None:
+            previous.close()
+        follower.start()
+
+    def forget(self, id: str):
+        with self.lock:
+            follower = self.followers.pop(id, None)
+            self.buffers.pop(id, None)
+
+        if follower is not None:
+            follower.close()
+
+    def snapshot(self, id: str, lines: int) -> str | None:
+        """
+        Last lines of the container logs, or None when the container isn't followed or more lines are asked than buffered,
+        for the caller to read them from the daemon. When fewer lines are buffered, blocks for up to SETTLE_TIMEOUT seconds
+        while the last lines of a stopping container are read
+        """
+        with self.lock:
+            buffer = self.buffers.get(id)
+            follower = self.followers.get(id)
+
+        if buffer is None or lines > self.max_lines:
+            return None
+
+        if follower is not None and buffer.line_count() < lines:
+            follower.closed.wait(self.SETTLE_TIMEOUT)
+
+        # Lines dropped by the byte cap are only left in the daemon logs
+        if buffer.line_count() < lines and buffer.truncated:
+            return None
+
+        return buffer.tail(lines).decode('utf-8', errors='ignore')
+
+    def _watch(self):
+        """
+        Follows the running containers, then the ones started from then on
+        """
+        try:
+            self.events = self.client.events(decode=True, filters={"type": "container", "event": ["start", "destroy"]})
+
+            for container in self.client.containers.list():
+                self.follow(container.id)
+
+            self.logger.info(f"Tailing the logs of {len(self.followers)} container(s)")
+
+            for event in self.events:
+                id = event.get("id") or event.get("Actor", {}).get("ID", "")
+
+                if not id:
+                    continue
+
+                if event.get("Action") == "start":
+                    self.follow(id)
+                elif event.get("Action") == "destroy":
+                    self.forget(id)
+        except Exception as e:
+            if not self.stopped.is_set():
+                self.logger.error(f"Log tailer stopped: {e}")
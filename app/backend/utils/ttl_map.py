@@ -0,0 +1,121 @@
+import asyncio
+import heapq
+from contextlib import asynccontextmanager
+from itertools import count
+from time import monotonic
+from typing import Any, AsyncIterator, Generic, Hashable, Iterator, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class TTLMap(Generic[K, V]):
+    """
+    Mapping whose entries expire ttl seconds after they were set, holding at most max_size entries.
+    Expiry times are kept in a min-heap, so expired entries are dropped in O(log n) each, on the next access,
+    instead of scanning the whole map. When the map is full, the entries closest to expiry are evicted first
+    """
+
+    def __init__(self, ttl: float, max_size: int | None = None):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: dict[K, tuple[float, V]] = {}
+        self._heap: list[tuple[float, int, K]] = []
+        self._sequence = count()
+
+    def set(self, key: K, value: V, ttl: float | None = None):
+        now = monotonic()
+        self._expire(now)
+
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        heapq.heappush(self._heap, (expires_at, next(self._sequence), key))
+
+        if self.max_size is not None:
+            while len(self._entries) > self.max_size:
+                self._pop_heap()
+
+        # Overwritten keys leave stale heap items behind. Rebuilding once they outnumber the live entries keeps the heap bounded
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(expires_at, next(self._sequence), key) for key, (expires_at, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        entry = self._entries.get(key)
+
+        if entry is None:
+            return default
+
+        if entry[0] <= monotonic():
+            self._expire(monotonic())
+            return default
+
+        return entry[1]
+
+    def pop(self, key: K, default: Any = None) -> V | Any:
+        value = self.get(key, _MISSING)
+
+        if value is _MISSING:
+            return default
+
+        # Its heap item is skipped once it surfaces
+        del self._entries[key]
+        return value
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        self._expire(monotonic())
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[K]:
+        self._expire(monotonic())
+        return iter(list(self._entries))
+
+    def _expire(self, now: float):
+        while self._heap and self._heap[0][0] <= now:
+            self._pop_heap()
+
+    def _pop_heap(self):
+        expires_at, _, key = heapq.heappop(self._heap)
+        entry = self._entries.get(key)
+
+        # The key may have been set again or removed since this item was pushed
+        if entry is not None and entry[0] == expires_at:
+            del self._entries[key]
+
+
+class KeyedLocks(Generic[K]):
+    """
+    One asyncio lock per key, created on first use and dropped as soon as no task holds or waits for it
+    """
+
+    def __init__(self):
+        self._locks: dict[K, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def __call__(self, key: K) -> AsyncIterator[None]:
+        lock, users = self._locks.get(key, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[key] = (lock, users + 1)
+
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def locked(self, key: K) -> bool:
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
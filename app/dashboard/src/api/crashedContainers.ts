@@ -1,9 +1,12 @@
 import { api } from "./client";
 import type {
   CrashedContainerChartStats,
-  CrashedContainerLogs,
+  CrashedContainerItem,
+  CrashedContainersPage,
 } from "../models/crashedContainer";
 
+const PAGE_SIZE = 100;
+
 export async function getChartStats(
   date_from: string,
   date_to: string
@@ -20,18 +23,33 @@ export async function getChartStats(
   }
 }
 
-export async function getCrashedContainersMetrics(
+// A single page of crashes, most recent first and without their logs: those are loaded with getCrashLogs once a crash is opened
+export async function getCrashedContainersPage(
   date_from: string,
-  date_to: string
-): Promise<CrashedContainerLogs[]> {
+  date_to: string,
+  cursor?: string | null
+): Promise<CrashedContainersPage> {
   try {
     const res = await api.get("/crashed_containers", {
-      params: { date_from, date_to },
+      params: { date_from, date_to, limit: PAGE_SIZE, cursor, include_logs: false, order: "desc" },
     });
 
     return res.data;
   } catch (error) {
     console.error(error);
-    return [];
+    return { items: [] };
+  }
+}
+
+export async function getCrashLogs(
+  crash_id: number
+): Promise<CrashedContainerItem | null> {
+  try {
+    const res = await api.get(`/crashed_containers/${crash_id}/logs`);
+
+    return res.data;
+  } catch (error) {
+    console.error(error);
+    return null;
   }
 }
@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useEffect, useState } from "react";
 import {
   ChevronDown,
   ChevronRight,
@@ -6,44 +6,101 @@ import {
   Box,
   FileText,
 } from "lucide-react";
-import type { CrashedContainerLogs } from "../../models/crashedContainer";
+import type { CrashedContainerItem } from "../../models/crashedContainer";
+import { getCrashLogs } from "../../api/crashedContainers";
 
 interface LogsViewerProps {
-  logs: Record<string, CrashedContainerLogs[]>;
+  crashes: Record<string, CrashedContainerItem[]>;
+  hasMore: boolean;
+  loadingMore: boolean;
+  onLoadMore: () => void;
 }
 
-export function LogsViewer({ logs }: LogsViewerProps) {
-  const [expandedMachine, setExpandedMachine] = useState<string | null>(null);
-  const [selected, setSelected] = useState<CrashedContainerLogs | null>(null);
-
-  const mergedLogs: Record<string, CrashedContainerLogs[]> = Object.fromEntries(
-    Object.entries(logs).map(([machine, containers]) => {
-      const map = new Map<string, CrashedContainerLogs>();
+interface ContainerCrashes {
+  container_id: string;
+  container_name: string;
+  machine: string;
+  // Most recent first
+  crashes: CrashedContainerItem[];
+}
 
-      for (const c of containers) {
+export function LogsViewer({ crashes, hasMore, loadingMore, onLoadMore }: LogsViewerProps) {
+  const [expandedMachine, setExpandedMachine] = useState<string | null>(null);
+  // Kept as ids so the selection follows the crashes of the pages loaded later
+  const [selectedKey, setSelectedKey] = useState<{ machine: string; container_id: string } | null>(null);
+  const [selectedCrashId, setSelectedCrashId] = useState<number | null>(null);
+  // Logs are fetched when a crash is opened, then kept for the next time
+  const [logsById, setLogsById] = useState<Record<number, string>>({});
+  const [loadingLogs, setLoadingLogs] = useState(false);
+
+  const containersByMachine: Record<string, ContainerCrashes[]> = Object.fromEntries(
+    Object.entries(crashes).map(([machine, items]) => {
+      const map = new Map<string, ContainerCrashes>();
+
+      for (const c of items) {
         const existing = map.get(c.container_id);
 
         if (!existing) {
           map.set(c.container_id, {
-            ...c,
-            logs: c.logs,
+            container_id: c.container_id,
+            container_name: c.container_name,
+            machine: c.machine,
+            crashes: [c],
           });
         } else {
-          map.set(c.container_id, {
-            ...existing,
-            logs: `${existing.logs}\n\n${c.logs}`,
-          });
+          existing.crashes.push(c);
         }
       }
 
+      for (const container of map.values()) {
+        container.crashes.sort((a, b) => (b.crashed_on ?? "").localeCompare(a.crashed_on ?? ""));
+      }
+
       return [machine, Array.from(map.values())] as const;
     })
   );
 
+  const selected =
+    selectedKey !== null
+      ? containersByMachine[selectedKey.machine]?.find((c) => c.container_id === selectedKey.container_id) ?? null
+      : null;
+
+  useEffect(() => {
+    if (selectedCrashId === null || logsById[selectedCrashId] !== undefined) {
+      return;
+    }
+
+    let cancelled = false;
+    setLoadingLogs(true);
+
+    getCrashLogs(selectedCrashId)
+      .then((crash) => {
+        if (!cancelled) {
+          setLogsById((prev) => ({ ...prev, [selectedCrashId]: crash?.logs ?? "" }));
+        }
+      })
+      .finally(() => {
+        if (!cancelled) {
+          setLoadingLogs(false);
+        }
+      });
+
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedCrashId, logsById]);
+
+  const selectContainer = (container: ContainerCrashes) => {
+    setSelectedKey({ machine: container.machine, container_id: container.container_id });
+    setSelectedCrashId(container.crashes[0]?.id ?? null);
+  };
+
+  const selectedLogs = selectedCrashId !== null ? logsById[selectedCrashId] : undefined;
+
   return (
     <div className="w-full grid grid-cols-1 md:grid-cols-12 gap-4">
       <div className="md:col-span-4 bg-[#242424] rounded-xl overflow-y-auto p-3 h-[250px] md:h-[55vh]">
-        {Object.entries(mergedLogs).map(([machine, containers]) => (
+        {Object.entries(containersByMachine).map(([machine, containers]) => (
           <div key={machine} className="mb-2">
             <button
               onClick={() =>
@@ -73,25 +130,39 @@ export function LogsViewer({ logs }: LogsViewerProps) {
                 {containers.map((container) => (
                   <button
                     key={container.container_id}
-                    onClick={() => setSelected(container)}
+                    onClick={() => selectContainer(container)}
                     className={`flex items-center gap-2 px-3 py-2 rounded-md text-left transition hover:cursor-pointer
                       ${
-                        selected?.container_id === container.container_id
+                        selected === container
                           ? "bg-neutral-600 text-white"
                           : "hover:bg-neutral-700"
                       }`}
                   >
                     <Box size={'0.9rem'} />
 
-                    <span className="truncate">
+                    <span className="truncate flex-1">
                       {container.container_name}
                     </span>
+
+                    <span className="text-xs text-gray-400">
+                      {container.crashes.length}
+                    </span>
                   </button>
                 ))}
               </div>
             )}
           </div>
         ))}
+
+        {hasMore && (
+          <button
+            onClick={onLoadMore}
+            disabled={loadingMore}
+            className="w-full mt-2 px-3 py-2 rounded-lg text-sm text-gray-300 hover:cursor-pointer hover:bg-neutral-700 transition disabled:opacity-50"
+          >
+            {loadingMore ? "Loading..." : "Load older crashes"}
+          </button>
+        )}
       </div>
 
       <div className="md:col-span-8 bg-[#242424] rounded-xl flex flex-col h-[350px] md:h-[55vh] overflow-y-auto">
@@ -105,10 +176,24 @@ export function LogsViewer({ logs }: LogsViewerProps) {
               <p className="text-sm text-gray-400">
                 Machine: {selected.machine}
               </p>
+
+              {selected.crashes.length > 1 && (
+                <select
+                  value={selectedCrashId ?? ""}
+                  onChange={(e) => setSelectedCrashId(Number(e.target.value))}
+                  className="mt-2 bg-neutral-700 rounded-md px-2 py-1 text-xs"
+                >
+                  {selected.crashes.map((crash) => (
+                    <option key={crash.id} value={crash.id}>
+                      {crash.crashed_on ? new Date(crash.crashed_on).toLocaleString() : `Crash #${crash.id}`}
+                    </option>
+                  ))}
+                </select>
+              )}
             </div>
 
             <pre className="flex-1 overflow-auto p-5 text-xs font-mono whitespace-pre-wrap leading-5 text-left">
-              {selected.logs}
+              {loadingLogs && selectedLogs === undefined ? "Loading logs..." : selectedLogs}
             </pre>
           </div>
         ) : (
@@ -125,4 +210,4 @@ export function LogsViewer({ logs }: LogsViewerProps) {
       </div>
     </div>
   );
-}
\ No newline at end of file
+}
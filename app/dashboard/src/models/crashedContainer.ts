@@ -5,9 +5,14 @@ export interface CrashedContainerBase {
     machine: string;
 }
 
-export interface CrashedContainerLogs extends CrashedContainerBase {
-    logs: string;
+export interface CrashedContainerItem extends CrashedContainerBase {
+    id: number;
+    logs?: string | null;
+}
 
+export interface CrashedContainersPage {
+    items: CrashedContainerItem[];
+    next_cursor?: string | null;
 }
 
 export interface CrashedContainerChartStats extends CrashedContainerBase {
@@ -1,12 +1,12 @@
 import { Navbar } from "../../components/navbar/navbar";
-import { useEffect, useMemo, useState } from "react";
+import { useCallback, useEffect, useMemo, useState } from "react";
 import type {
   CrashedContainerChartStats,
-  CrashedContainerLogs,
+  CrashedContainerItem,
 } from "../../models/crashedContainer";
 import {
   getChartStats,
-  getCrashedContainersMetrics,
+  getCrashedContainersPage,
 } from "../../api/crashedContainers";
 import { Chart } from "../../components/chart/chart";
 import { DatePickerForm } from "../../components/datepickerform/datepickerform";
@@ -14,7 +14,9 @@ import { formatLocalDate } from "../../utils/utils";
 import { LogsViewer } from "../../components/logsViewer/logsviewer";
 
 export function Homepage() {
-  const [containerLogs, setContainerLogs] = useState<Record<string, CrashedContainerLogs[]>>({});
+  const [crashes, setCrashes] = useState<CrashedContainerItem[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [chartStats, setChartStats] = useState<Record<string, CrashedContainerChartStats[]>>({});
 
   const [loading, setLoading] = useState(true);
@@ -22,8 +24,8 @@ export function Homepage() {
 
   const apiCalls = useMemo(async () => {
     try {
-      const [containerLogsRes, statsRes] = await Promise.all([
-        getCrashedContainersMetrics(
+      const [crashesPage, statsRes] = await Promise.all([
+        getCrashedContainersPage(
           formatLocalDate(dateRange.startDate),
           formatLocalDate(dateRange.endDate)
         ),
@@ -33,20 +35,13 @@ export function Homepage() {
         ),
       ]);
       
-      if (!Array.isArray(containerLogsRes) || !Array.isArray(statsRes)) {
-        console.error("API response is not an array", { containerLogsRes, statsRes });
+      if (!Array.isArray(crashesPage.items) || !Array.isArray(statsRes)) {
+        console.error("API response is not an array", { crashesPage, statsRes });
         return;
       }
 
-      const logsByMachine = containerLogsRes.reduce((acc: Record<string, CrashedContainerLogs[]>, item: CrashedContainerLogs) => {
-        if (!acc[item.machine]) {
-          acc[item.machine] = [];
-        }
-        acc[item.machine].push(item);
-        return acc;
-      }, {} as Record<string, CrashedContainerLogs[]>);
-
-      setContainerLogs(logsByMachine);
+      setCrashes(crashesPage.items);
+      setNextCursor(crashesPage.next_cursor ?? null);
 
       const statsByMachine = statsRes.reduce((acc: Record<string, CrashedContainerChartStats[]>, item: CrashedContainerChartStats) => {
         if (!acc[item.machine]) {
@@ -68,6 +63,39 @@ export function Homepage() {
     setLoading(true);
   }, [apiCalls]);
 
+  // Further pages are only fetched when asked for
+  const loadMore = useCallback(async () => {
+    if (!nextCursor) {
+      return;
+    }
+
+    setLoadingMore(true);
+    try {
+      const page = await getCrashedContainersPage(
+        formatLocalDate(dateRange.startDate),
+        formatLocalDate(dateRange.endDate),
+        nextCursor
+      );
+
+      setCrashes((prev) => [...prev, ...page.items]);
+      setNextCursor(page.next_cursor ?? null);
+    } finally {
+      setLoadingMore(false);
+    }
+  }, [dateRange, nextCursor]);
+
+  const crashesByMachine = useMemo(
+    () =>
+      crashes.reduce((acc: Record<string, CrashedContainerItem[]>, item: CrashedContainerItem) => {
+        if (!acc[item.machine]) {
+          acc[item.machine] = [];
+        }
+        acc[item.machine].push(item);
+        return acc;
+      }, {} as Record<string, CrashedContainerItem[]>),
+    [crashes]
+  );
+
   return (
     <div className="w-[75%] flex flex-col min-h-screen my-5 p-0 gap-10">
       <Navbar />
@@ -99,7 +127,12 @@ export function Homepage() {
         <div className="col-span-3 text-start text-xl mb-2">
           <p className="text-start text-sm sm:text-xl p-3"> Crash History </p>
         </div> 
-        <LogsViewer logs={containerLogs} />
+        <LogsViewer
+          crashes={crashesByMachine}
+          hasMore={nextCursor !== null}
+          loadingMore={loadingMore}
+          onLoadMore={loadMore}
+        />
       </div>
     </div>
   );
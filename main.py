@@ -1,13 +1,23 @@
+import atexit
 import os
+import signal
+import sys
 
 from app.backend.core import Config
 from app.backend.core import get_bootstrap_logger, get_logger
+from app.backend.core import state
 from app.backend.core.database import init_db
 from app.backend.core.runtime import Runtime
+from app.backend.core.runtime_supervisor import RuntimeSupervisor
 from threading import Thread
 from app.backend.providers import DockerClientProvider
+from app.backend.providers.docker_executor import DockerExecutor
+from app.backend.utils.log_tailer import LogTailer
 import docker
 
+# Seconds to wait for each runtime loop to stop on shutdown
+RUNTIME_STOP_TIMEOUT = 10
+
 
 def bootstrap():
     import time
@@ -22,9 +32,6 @@ def bootstrap():
     init_db(logger)
     return config, logger
 
-def run_runtime(runtime: Runtime):
-    runtime.start()
-
 def run_agent():
     config, logger = bootstrap()
 
@@ -37,11 +44,77 @@ def run_agent():
     agent_server = AgentServer(config, logger)
     agent_server.run()
 
+def backfill_stats():
+    config, logger = bootstrap()
+
+    from app.backend.repositories.crashed_container_repository import CrashedContainerRepository
+    logger.info("Rebuilding the daily crash stats from the crashed containers table")
+    CrashedContainerRepository.rebuild_daily_stats(logger)
+
+def run_retention():
+    config, logger = bootstrap()
+
+    from app.backend.services import RetentionService
+    if not config.retention_policy:
+        logger.error("No retention policy set. Please set RETENTION_POLICY in the environment variables.")
+        exit(1)
+
+    RetentionService(config, logger).run()
+
+def run_dashboard(config, logger):
+    import uvicorn
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+    from app.backend.api.api_router import api_router
+    from fastapi.responses import FileResponse
+    from os import path
+
+    logger.info("Starting FastAPI server for Docker Surgeon API...")
+    DASHBOARD_DIR = "app/dashboard_build"
+
+    app = FastAPI(
+        title="Docker Surgeon API",
+        description="A tool to monitor and manage Docker containers."
+    )  
+
+    app.mount(
+        "/assets",
+        StaticFiles(directory=f"{DASHBOARD_DIR}/assets"),
+        name="assets"
+    )
+    app.include_router(api_router, prefix="/api")
+
+    @app.get("/{full_path:path}")
+    def serve_dashboard(full_path: str):
+        return FileResponse(path.join(DASHBOARD_DIR, "index.html"))
+    
+    uvicorn.run(app, host= config.dashboard_address, port= config.dashboard_port, reload=False)
+    logger.info("FastAPI server started")
+
+def shutdown(config, logger, supervisors, threads):
+    """
+    Stops the runtimes, then writes the crashes they queued and sends the pending notifications
+    """
+    from app.backend.notifications import NotificationDispatcher
+    from app.backend.services import CrashPersistenceService
+
+    logger.info("Shutting down")
+    for supervisor in supervisors:
+        supervisor.stop()
+    for t in threads:
+        t.join(RUNTIME_STOP_TIMEOUT)
+
+    CrashPersistenceService(config, logger).stop()
+    NotificationDispatcher(config, logger).stop()
+
 def run_server():
     config, logger = bootstrap()
 
     threads: list[Thread] = []
-    runtimes = []
+    supervisors: list[RuntimeSupervisor] = []
+
+    from app.backend.services import RetentionService
+    RetentionService(config, logger).start()
 
     # =========================
     # 1. LOCAL DOCKER RUNTIME
@@ -49,84 +122,94 @@ def run_server():
     logger.info("Starting LOCAL docker runtime")
 
     local_docker = docker.from_env()
-    local_provider = DockerClientProvider(local_docker)
+    log_tailer = LogTailer.from_config(config, logger) if config.enable_log_tail else None
+    if log_tailer is not None:
+        log_tailer.start()
+        # Closes the log streams and the connections of the tailer when the server exits
+        atexit.register(log_tailer.stop)
+
+    local_provider = DockerClientProvider(local_docker, DockerExecutor.from_config(config, logger), log_tailer)
 
     local_runtime = Runtime(config, logger, local_provider)
 
-    t = Thread(
-        target=run_runtime,
-        args=(local_runtime,),
-        daemon=True
-    )
-    t.start()
-    threads.append(t)
+    local_supervisor = RuntimeSupervisor("local", logger)
+    local_supervisor.add(local_runtime)
+    supervisors.append(local_supervisor)
 
     # =========================
     # 2. AGENT/S RUNTIME
     # =========================
+    # Agents don't get a thread each: they run as tasks on a small pool of shared loops,
+    # and the agents of a loop share their HTTP connection pools
+    from app.agent.utils.agent_logger import AgentLogger
+    from app.agent import AgentClient
+    from app.backend.providers import AgentClientProvider
+
+    # Crashes and crash loops are tracked by machine name: agents must be named, and uniquely
+    agents = []
+    names = {DockerClientProvider.SERVER_MACHINE}
     for agent in config.agents_config:
-        logger.info(f"Starting agent {agent.name}")
-
-        if not agent.host or not agent.port or not agent.token:
+        if not agent.host or not agent.port or not agent.token or not agent.name:
             logger.error(f"Invalid config for agent {agent.name}")
             continue
-        
-        from app.agent.utils.agent_logger import AgentLogger
-        from app.agent import AgentClient
-        from app.backend.providers import AgentClientProvider
+        if agent.name in names:
+            logger.error(f"Agent name {agent.name} is already used, the agent is ignored")
+            continue
+        names.add(agent.name)
+        agents.append(agent)
 
-        agent_logger = AgentLogger(logger, extra={"agent_name": agent.name})
+    shards = [RuntimeSupervisor(f"agents-{i}", logger) for i in range(min(max(config.agent_runtime_shards, 1), len(agents)))]
+    supervisors.extend(shards)
 
-        agent_client = AgentClient(
-            base_url=agent.base_url,
-            token=agent.token,
+    # One shared HTTP client per loop and verify_ssl setting, sized for all the agents using it
+    http_clients = {}
+    for index, agent in enumerate(agents):
+        key = (index % len(shards), agent.verify_ssl)
+        http_clients[key] = http_clients.get(key, 0) + 1
+
+    for key, agents_count in http_clients.items():
+        http_clients[key] = AgentClient.build_http_client(
             logger=logger,
-            name=agent.name
+            verify_ssl=key[1],
+            http2=config.agent_http2,
+            max_connections=config.agent_max_connections * agents_count,
+            max_keepalive_connections=config.agent_max_keepalive_connections * agents_count,
+            keepalive_expiry=config.agent_keepalive_expiry,
+            connect_timeout=config.agent_connect_timeout,
+            read_timeout=config.agent_read_timeout
         )
 
+    for index, agent in enumerate(agents):
+        logger.info(f"Starting agent {agent.name}")
+        shard = index % len(shards)
+
+        agent_logger = AgentLogger(logger, extra={"agent_name": agent.name})
+
+        agent_client = AgentClient.from_config(agent, config, logger, http_client=http_clients[(shard, agent.verify_ssl)])
+        state.agent_clients.append(agent_client)
+
         provider = AgentClientProvider(agent_client)
 
         runtime = Runtime(config, agent_logger, provider)
-        runtimes.append(runtime)
+        shards[shard].add(runtime)
+
+    # docker stop sends SIGTERM, which would otherwise kill the process without any cleanup
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
 
+    for supervisor in supervisors:
         t = Thread(
-            target=run_runtime,
-            args=(runtime,),
+            target=supervisor.start,
+            name=f"runtime-{supervisor.name}",
             daemon=True
         )
-
         t.start()
         threads.append(t)
 
-    if config.enable_dashboard:
-        import uvicorn
-        from fastapi import FastAPI
-        from fastapi.staticfiles import StaticFiles
-        from app.backend.api.api_router import api_router
-        from fastapi.responses import FileResponse
-        from os import path
-
-        logger.info("Starting FastAPI server for Docker Surgeon API...")
-        DASHBOARD_DIR = "app/dashboard_build"
-
-        app = FastAPI(
-            title="Docker Surgeon API",
-            description="A tool to monitor and manage Docker containers."
-        )  
-
-        app.mount(
-            "/assets",
-            StaticFiles(directory=f"{DASHBOARD_DIR}/assets"),
-            name="assets"
-        )
-        app.include_router(api_router, prefix="/api")
-
-        @app.get("/{full_path:path}")
-        def serve_dashboard(full_path: str):
-            return FileResponse(path.join(DASHBOARD_DIR, "index.html"))
-        
-        uvicorn.run(app, host= config.dashboard_address, port= config.dashboard_port, reload=False)
-        logger.info("FastAPI server started")
+    try:
+        if config.enable_dashboard:
+            run_dashboard(config, logger)
 
-    for t in threads:
-        t.join()
\ No newline at end of file
+        for t in threads:
+            t.join()
+    finally:
+        shutdown(config, logger, supervisors, threads)
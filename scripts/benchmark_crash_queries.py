@@ -0,0 +1,156 @@
+"""
+Measures the dashboard crash queries against the size of the crashedcontainers table.
+
+Compares the former date() predicate with the half-open range used by CrashedContainerRepository,
+on a throwaway SQLite database migrated to head. Run from the repository root:
+
+    python scripts/benchmark_crash_queries.py [--sizes 10000 100000 1000000] [--days 7] [--runs 5]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DATA_DIR = tempfile.mkdtemp(prefix="crash-benchmark-")
+os.environ["DATABASE_URI"] = f"sqlite:///{DATA_DIR}/benchmark.db"
+
+import app.backend.core  # noqa: E402
+from sqlalchemy import and_, func, insert, text  # noqa: E402
+from app.backend.core.database import ReadSessionLocal, engine, init_db  # noqa: E402
+from app.backend.models.crash_log import CrashLog  # noqa: E402
+from app.backend.models.crashed_container import CrashedContainer  # noqa: E402
+from app.backend.repositories.crashed_container_repository import CrashedContainerRepository  # noqa: E402
+
+MACHINES = ["Server"] + [f"agent-{i}" for i in range(9)]
+CONTAINERS = [f"container-{i}" for i in range(200)]
+# The crashes are spread over this many days before now
+HISTORY_DAYS = 365
+INSERT_BATCH = 10000
+# Crashes share their logs snapshots, as repeated crashes of a container mostly do
+DISTINCT_LOGS = 500
+
+
+def seed_logs() -> list[str]:
+    """
+    Stores the logs snapshots referenced by the crashes, and returns their hashes
+    """
+    snapshots = [f"log line {i}\n" * 10 for i in range(DISTINCT_LOGS)]
+    hashes = [CrashLog.hash_of(logs) for logs in snapshots]
+
+    with engine.begin() as conn:
+        if not conn.execute(text("SELECT COUNT(*) FROM crash_logs")).scalar():
+            conn.execute(insert(CrashLog), [
+                {"hash": logs_hash, "data": CrashLog.compress(logs), "size": len(logs.encode())}
+                for logs_hash, logs in zip(hashes, snapshots)
+            ])
+
+    return hashes
+
+
+def fill(rows: int, now: datetime, logs_hashes: list[str]):
+    """
+    Grows the table to the given number of rows
+    """
+    with engine.begin() as conn:
+        current = conn.execute(text("SELECT COUNT(*) FROM crashedcontainers")).scalar()
+
+        while current < rows:
+            batch = min(INSERT_BATCH, rows - current)
+            conn.execute(insert(CrashedContainer), [
+                {
+                    "container_id": f"{random.getrandbits(48):012x}",
+                    "container_name": random.choice(CONTAINERS),
+                    "logs_hash": random.choice(logs_hashes),
+                    "crashedon": now - timedelta(seconds=random.randrange(HISTORY_DAYS * 86400)),
+                    "machine": random.choice(MACHINES)
+                }
+                for _ in range(batch)
+            ])
+            current += batch
+
+
+def legacy_predicate(date_from: datetime, date_to: datetime):
+    crash_date = func.date(CrashedContainer.crashedon)
+    return and_(crash_date >= date_from.strftime("%Y-%m-%d"), crash_date <= date_to.strftime("%Y-%m-%d"))
+
+
+def crashes_query(db, predicate):
+    return (
+        db.query(CrashedContainer.container_id, CrashedContainer.container_name, CrashLog.data, CrashedContainer.crashedon, CrashedContainer.machine)
+        .outerjoin(CrashLog, CrashLog.hash == CrashedContainer.logs_hash)
+        .filter(predicate)
+        .order_by(CrashedContainer.crashedon.asc())
+    )
+
+
+def run_query(predicate) -> int:
+    with ReadSessionLocal() as db:
+        return len(crashes_query(db, predicate).all())
+
+
+def query_plan(predicate) -> str:
+    with ReadSessionLocal() as db:
+        statement = crashes_query(db, predicate).statement.compile(engine, compile_kwargs={"literal_binds": True})
+        return " | ".join(row[-1] for row in db.execute(text(f"EXPLAIN QUERY PLAN {statement}")))
+
+
+def timed(fn, runs: int) -> float:
+    """
+    Best of the given number of runs, in milliseconds
+    """
+    best = None
+    for _ in range(runs):
+        start = perf_counter()
+        fn()
+        elapsed = (perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--days", type=int, default=7, help="Width of the queried date range")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    init_db(logging.getLogger("benchmark"))
+
+    now = datetime.now()
+    date_to = now
+    date_from = now - timedelta(days=args.days - 1)
+
+    logs_hashes = seed_logs()
+    legacy = legacy_predicate(date_from, date_to)
+    ranged = CrashedContainerRepository._crashed_between(date_from, date_to)
+
+    print(f"Database: {os.environ['DATABASE_URI']} | range: {args.days} day(s) | best of {args.runs}")
+    print(f"{'rows':>10} {'matched':>8} {'date() ms':>10} {'range ms':>10} {'stats ms':>10}")
+
+    for size in sorted(args.sizes):
+        fill(size, now, logs_hashes)
+        # The chart stats are read from the daily rollup, which the raw inserts above don't maintain
+        CrashedContainerRepository.rebuild_daily_stats(logging.getLogger("benchmark"))
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+        matched = run_query(ranged)
+        legacy_ms = timed(lambda: run_query(legacy), args.runs)
+        ranged_ms = timed(lambda: run_query(ranged), args.runs)
+        stats_ms = timed(lambda: CrashedContainerRepository.get_crashed_containers_stats_by_date(date_from, date_to), args.runs)
+
+        print(f"{size:>10} {matched:>8} {legacy_ms:>10.1f} {ranged_ms:>10.1f} {stats_ms:>10.1f}")
+
+    print(f"\ndate() plan: {query_plan(legacy)}")
+    print(f"range plan:  {query_plan(ranged)}")
+
+
+if __name__ == "__main__":
+    main()
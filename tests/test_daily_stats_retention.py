@@ -0,0 +1,42 @@
+import logging
+import os
+import tempfile
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+# The database is configured when the app is imported
+os.environ["DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp(prefix='docker-surgeon-tests-')}/tests.db"
+
+import app.backend.core  # noqa: E402
+from app.backend.core.database import init_db  # noqa: E402
+from app.backend.repositories.crashed_container_repository import CrashedContainerRepository  # noqa: E402
+from app.backend.schemas.crashed_container_schema import CrashedContainerLogs  # noqa: E402
+from app.backend.services.retention_service import RetentionService  # noqa: E402
+
+logger = logging.getLogger("tests")
+
+
+def crash(name: str, crashed_on: datetime) -> CrashedContainerLogs:
+    return CrashedContainerLogs(container_id=f"{name}-id", container_name=name, logs="boom", machine="Server", crashed_on=crashed_on)
+
+
+def counts(date_from: datetime, date_to: datetime) -> dict:
+    return {(s.crashed_on, s.container_name): s.crash_count for s in CrashedContainerRepository.get_crashed_containers_stats_by_date(date_from, date_to)}
+
+
+def test_rebuild_keeps_the_stats_of_crashes_deleted_by_retention():
+    init_db(logger)
+    now = datetime.now()
+    old = now - timedelta(days=40)
+
+    CrashedContainerRepository.add_crashed_containers([crash("old", old), crash("old", old), crash("recent", now)], logger)
+
+    config = SimpleNamespace(retention_policy={"default": {"rowsDays": 30}}, retention_interval=3600, retention_batch_size=100)
+    report = RetentionService(config, logger).run()
+    assert report.rows_deleted == 2
+
+    CrashedContainerRepository.rebuild_daily_stats(logger)
+
+    stats = counts(old - timedelta(days=1), now)
+    assert stats[(old.date(), "old")] == 2
+    assert stats[(now.date(), "recent")] == 1